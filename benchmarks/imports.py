@@ -0,0 +1,226 @@
+"""Import-time budget of the Terneo integration.
+
+Home Assistant imports the integration, its platforms and its config flow
+at boot, and the cloud and LAN transports once a config entry is set up.
+Each stage imports the real package in a fresh interpreter that has
+already imported what Home Assistant core loads anyway (asyncio, logging,
+dataclasses, json, ...). Home Assistant and voluptuous are replaced by
+empty stand-ins, so only the integration's own imports are measured and
+the benchmark runs without them installed. The script exits with status 1
+when the boot stage goes over its budget or pulls in one of the modules
+that should only load with an entry.
+
+    python -m benchmarks.imports
+    python -m benchmarks.imports --budget-ms 30 --repeat 20 --top 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PACKAGE = "custom_components.terneo"
+
+# Already imported by Home Assistant core before any integration loads.
+PRELOADED = (
+    "__future__",
+    "asyncio",
+    "collections",
+    "dataclasses",
+    "datetime",
+    "email.utils",
+    "json",
+    "logging",
+    "random",
+    "re",
+    "typing",
+)
+
+# Replaced by stand-ins: their import cost isn't the integration's.
+STUBBED = ("homeassistant", "voluptuous")
+
+# What Home Assistant imports before any entry is set up.
+BOOT_MODULES = (
+    PACKAGE,
+    f"{PACKAGE}.climate",
+    f"{PACKAGE}.config_flow",
+    f"{PACKAGE}.diagnostics",
+    f"{PACKAGE}.sensor",
+)
+
+# Must not be loaded before an entry is set up.
+DEFERRED_MODULES = (
+    "httpx",
+    f"{PACKAGE}.terneo_net.cloud",
+    f"{PACKAGE}.terneo_net.local",
+    f"{PACKAGE}.terneo_net.protocol",
+    f"{PACKAGE}.terneo_net.trace",
+    f"{PACKAGE}.terneo_net.transport",
+)
+
+STAGES = {
+    "boot": "\n".join(f"import {module}" for module in BOOT_MODULES),
+    "entry": f"sys.modules['{PACKAGE}.terneo_net'].load_transports()",
+}
+
+# Any attribute of a stubbed module is a class that accepts being
+# subclassed, subscripted, called, used as a decorator or read from.
+STUBS = """
+import importlib.abc, importlib.machinery, types
+
+class _StubType(type):
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _StubType(name, (_Stub,), {})
+
+    def __call__(cls, *args, **kwargs):
+        if len(args) == 1 and not kwargs and callable(args[0]):
+            return args[0]
+        try:
+            return super().__call__(*args, **kwargs)
+        except TypeError:
+            # Dataclasses built on a stub don't know the stub's fields.
+            instance = cls.__new__(cls)
+            instance.__dict__.update(kwargs)
+            return instance
+
+class _Stub(metaclass=_StubType):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __init_subclass__(cls, **kwargs):
+        pass
+
+    def __class_getitem__(cls, item):
+        return cls
+
+    def __getattr__(self, name):
+        return _StubType(name, (_Stub,), {})
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _StubType(name, (_Stub,), {})
+
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split(".")[0] in STUBBED:
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        return _StubModule(spec.name)
+
+    def exec_module(self, module):
+        module.__path__ = []
+
+sys.meta_path.insert(0, _StubFinder())
+"""
+
+MEASURE = """
+import json, sys, time
+{stubs}
+{preload}
+{setup}
+before = set(sys.modules)
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "modules": sorted(set(sys.modules) - before),
+}}))
+"""
+
+
+def measure(stage: str, importtime: bool = False) -> tuple[dict, str]:
+    """Time one stage in a new interpreter; returns its report and stderr."""
+    setup = "" if stage == "boot" else STAGES["boot"]
+    script = MEASURE.format(
+        stubs=f"STUBBED = {set(STUBBED)!r}\n{STUBS}",
+        preload="\n".join(f"import {module}" for module in PRELOADED),
+        setup=setup,
+        code=STAGES[stage],
+    )
+    command = [sys.executable, "-c", script]
+    if importtime:
+        command[1:1] = ["-X", "importtime"]
+    completed = subprocess.run(
+        command,
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(completed.stdout)
+    report["modules"] = [
+        m for m in report["modules"] if m.split(".")[0] not in STUBBED
+    ]
+    return report, completed.stderr
+
+
+def heaviest(
+    importtime_log: str, loaded: list[str], count: int
+) -> list[tuple[str, float]]:
+    """Modules of a stage with the largest self time in a -X importtime log."""
+    modules = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:") :].split("|")
+        if name.strip() in loaded:
+            modules.append((name.strip(), int(self_us) / 1000))
+    return sorted(modules, key=lambda item: item[1], reverse=True)[:count]
+
+
+def run(args) -> dict:
+    report = {}
+    for stage in STAGES:
+        runs = [measure(stage)[0] for _ in range(args.repeat)]
+        loaded = runs[0]["modules"]
+        report[stage] = {
+            "median_ms": round(statistics.median(r["ms"] for r in runs), 2),
+            "max_ms": round(max(r["ms"] for r in runs), 2),
+            "modules": len(loaded),
+            "deferred_loaded": [m for m in DEFERRED_MODULES if m in loaded],
+        }
+        if args.top:
+            _, log = measure(stage, importtime=True)
+            report[stage]["heaviest_ms"] = dict(heaviest(log, loaded, args.top))
+    boot = report["boot"]
+    boot["budget_ms"] = args.budget_ms
+    boot["ok"] = boot["median_ms"] <= args.budget_ms and not boot["deferred_loaded"]
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=40.0,
+        help="median import time allowed for the boot stage",
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--top", type=int, default=0, help="list the N heaviest modules per stage"
+    )
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = run(arguments)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if arguments.json:
+        arguments.json.write_text(text + "\n")
+    sys.exit(0 if result["boot"]["ok"] else 1)
@@ -0,0 +1,260 @@
+"""In-process stand-ins for the Terneo cloud and for LAN thermostats.
+
+Both are served through one ``httpx.MockTransport``: requests to
+``my.terneo.ua`` hit the mock cloud, any other host is treated as the IP of
+a simulated thermostat answering ``api.cgi``. Thermostats also announce
+themselves over UDP like real devices, sending from their own loopback
+address (127.1.x.y, Linux only) to the discovery port.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+import json
+import random
+import re
+import socket
+
+import httpx
+
+CLOUD_HOST = "my.terneo.ua"
+UDP_PORT = 23500
+
+
+@dataclass
+class Faults:
+    """Latency and error injection for one side of the mock."""
+
+    latency: float = 0.0
+    jitter: float = 0.5
+    error_rate: float = 0.0
+
+    async def apply(self) -> bool:
+        """Sleep for the injected latency; return False to fail the request."""
+        if self.latency:
+            spread = self.latency * self.jitter
+            await asyncio.sleep(
+                max(0.0, self.latency + random.uniform(-spread, spread))
+            )
+        return random.random() >= self.error_rate
+
+
+@dataclass
+class SimulatedDevice:
+    id: int
+    serial_number: str
+    ip: str
+    name: str
+    temperature: float = 21.0
+    setpoint: int = 22
+    heating: bool = False
+    power_off: bool = False
+    brightness: int = 5
+
+    def step(self, rng: random.Random) -> None:
+        """Drift the room temperature and flip the relay like a thermostat."""
+        if self.power_off:
+            self.heating = False
+            self.temperature -= rng.uniform(0, 0.1)
+            return
+        if self.heating:
+            self.temperature += rng.uniform(0, 0.2)
+        else:
+            self.temperature -= rng.uniform(0, 0.1)
+        if self.temperature < self.setpoint - 0.5:
+            self.heating = True
+        elif self.temperature > self.setpoint + 0.5:
+            self.heating = False
+
+    def cloud_detail(self) -> dict:
+        return {
+            **self.cloud_summary(),
+            "data": {
+                "device_off": self.power_off,
+                "temp_current": f"{self.temperature:.1f}",
+                "setpoint_state": self.heating,
+                "temp_setpoint": self.setpoint,
+            },
+        }
+
+    def cloud_summary(self) -> dict:
+        return {
+            "id": self.id,
+            "sn": self.serial_number,
+            "name": self.name,
+            "type": 1,
+            "version_name": "2.4",
+            "image": "/static/img/ax-white.png",
+        }
+
+    def local_telemetry(self) -> dict:
+        return {
+            "sn": self.serial_number,
+            "t.1": str(int(self.temperature * 16)),
+            "t.5": str(self.setpoint * 16),
+            "f.0": "1" if self.heating else "0",
+            "f.16": "1" if self.power_off else "0",
+        }
+
+    def local_parameters(self) -> dict:
+        return {
+            "sn": self.serial_number,
+            "par": [
+                [5, 1, str(self.setpoint)],
+                [17, 4, "1500"],
+                [19, 2, "10"],
+                [23, 2, str(self.brightness)],
+                [125, 7, "1" if self.power_off else "0"],
+            ],
+        }
+
+    def discovery_packet(self) -> bytes:
+        return json.dumps(
+            {"sn": self.serial_number, "hw": "ax", "cloud": "true", "wifi": "-50"}
+        ).encode()
+
+
+def make_fleet(count: int, seed: int = 0) -> list[SimulatedDevice]:
+    rng = random.Random(seed)
+    return [
+        SimulatedDevice(
+            id=1000 + i,
+            serial_number=f"BENCH{i:06d}",
+            ip=f"127.1.{i // 250}.{i % 250 + 1}",
+            name=f"Thermostat {i}",
+            temperature=rng.uniform(17, 24),
+            setpoint=rng.randint(19, 24),
+            power_off=rng.random() < 0.2,
+        )
+        for i in range(count)
+    ]
+
+
+@dataclass
+class MockTerneo:
+    """Mock cloud and LAN fleet sharing the same simulated devices."""
+
+    devices: list[SimulatedDevice]
+    cloud_faults: Faults = field(default_factory=Faults)
+    lan_faults: Faults = field(default_factory=Faults)
+    page_size: int | None = None
+    list_includes_telemetry: bool = False
+    # Time an address without a thermostat takes to fail, like a real timeout.
+    unreachable_delay: float = 0.0
+    token: str = "bench-token"
+    requests: Counter = field(default_factory=Counter)
+
+    def __post_init__(self) -> None:
+        self._by_id = {d.id: d for d in self.devices}
+        self._by_ip = {d.ip: d for d in self.devices}
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=self.transport)
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+
+    def total_requests(self, prefix: str = "") -> int:
+        return sum(n for key, n in self.requests.items() if key.startswith(prefix))
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host == CLOUD_HOST:
+            return await self._handle_cloud(request)
+        return await self._handle_lan(request)
+
+    async def _handle_cloud(self, request: httpx.Request) -> httpx.Response:
+        path = re.sub(r"/\d+/", "/{id}/", request.url.path)
+        self.requests[f"cloud {request.method} {path}"] += 1
+        if not await self.cloud_faults.apply():
+            return httpx.Response(503)
+
+        if request.url.path == "/api/login/":
+            return httpx.Response(200, json={"access_token": self.token})
+        if request.headers.get("Authorization") != f"Token {self.token}":
+            return httpx.Response(401, json={"detail": "Invalid token."})
+
+        if request.url.path == "/api/device/":
+            return httpx.Response(200, json=self._device_page(request))
+
+        match = re.fullmatch(r"/api(-v2)?/device/(\d+)/(.*)", request.url.path)
+        device = match and self._by_id.get(int(match.group(2)))
+        if not device:
+            return httpx.Response(404)
+        action = match.group(3)
+        if request.method == "GET" and not action:
+            return httpx.Response(200, json=device.cloud_detail())
+        if request.method == "PUT" and action == "setpoint/":
+            device.setpoint = int(json.loads(request.content)["value"])
+            return httpx.Response(200, json={"value": device.setpoint})
+        if request.method == "PUT" and action == "basic-parameters/":
+            device.power_off = bool(json.loads(request.content)["power_off"])
+            return httpx.Response(
+                200, json={"result": {"power_off": device.power_off}}
+            )
+        return httpx.Response(404)
+
+    def _device_page(self, request: httpx.Request) -> dict:
+        page = int(request.url.params.get("page", 1))
+        size = self.page_size or max(len(self.devices), 1)
+        chunk = self.devices[(page - 1) * size : page * size]
+        has_next = page * size < len(self.devices)
+        return {
+            "count": len(self.devices),
+            "next": f"{request.url.copy_with(query=None)}?page={page + 1}"
+            if has_next
+            else None,
+            "previous": None,
+            "results": [
+                d.cloud_detail() if self.list_includes_telemetry else d.cloud_summary()
+                for d in chunk
+            ],
+        }
+
+    async def _handle_lan(self, request: httpx.Request) -> httpx.Response:
+        device = self._by_ip.get(request.url.host)
+        if device is None:
+            self.requests["lan unreachable"] += 1
+            await asyncio.sleep(self.unreachable_delay)
+            raise httpx.ConnectTimeout("No route to host", request=request)
+        payload = json.loads(request.content)
+        kind = f"cmd:{payload['cmd']}" if "cmd" in payload else "par"
+        self.requests[f"lan {kind}"] += 1
+        if not await self.lan_faults.apply():
+            raise httpx.ReadTimeout("Simulated timeout", request=request)
+
+        if payload.get("cmd") == 4:
+            return httpx.Response(200, json=device.local_telemetry())
+        if payload.get("cmd") == 1:
+            return httpx.Response(200, json=device.local_parameters())
+        for number, _type, value in payload.get("par", []):
+            if number == 5:
+                device.setpoint = int(value)
+            elif number == 23:
+                device.brightness = int(value)
+            elif number == 125:
+                device.power_off = value == "1"
+        return httpx.Response(200, json={"success": True})
+
+    async def broadcast(
+        self,
+        devices: list[SimulatedDevice] | None = None,
+        target: tuple[str, int] = ("127.0.0.1", UDP_PORT),
+        batch: int = 10,
+    ) -> int:
+        """Send one discovery packet per device from its own address."""
+        sent = 0
+        for index, device in enumerate(self.devices if devices is None else devices):
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.bind((device.ip, 0))
+                sock.sendto(device.discovery_packet(), target)
+            sent += 1
+            if index % batch == batch - 1:
+                # Give the receiver a chance to drain its socket buffer.
+                await asyncio.sleep(0.001)
+        return sent
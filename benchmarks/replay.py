@@ -0,0 +1,135 @@
+"""Replay a recorded trace against the networking layer.
+
+Traces come from the terneo.record_trace service or from
+``python -m benchmarks.run --scenario fleet --record trace.jsonl.gz``. The
+real CloudService, LocalService, TransportRouter and PollScheduler run
+against the recorded responses while the recorded broadcasts are fed to
+discovery, so request counts and poll latencies can be compared before and
+after a change.
+
+    python -m benchmarks.replay trace.jsonl.gz --speed 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+import json
+from pathlib import Path
+import sys
+import time
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "terneo"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+import httpx  # noqa: E402
+
+from terneo_net.cache import TelemetryCache  # noqa: E402
+from terneo_net.cloud import CloudService  # noqa: E402
+from terneo_net.local import LocalService  # noqa: E402
+from terneo_net.metrics import normalize_endpoint  # noqa: E402
+from terneo_net.models import TerneoDevice  # noqa: E402
+from terneo_net.resilience import TokenBucket  # noqa: E402
+from terneo_net.scheduler import PollScheduler  # noqa: E402
+from terneo_net.trace import TraceReplay, load_trace  # noqa: E402
+from terneo_net.transport import TransportRouter  # noqa: E402
+
+from .run import percentile  # noqa: E402
+
+POLL_WINDOW = 5.0
+
+
+def lan_addresses(events: list[dict]) -> dict[str, str]:
+    """Serial number by IP for thermostats that answered on the LAN."""
+    result = {}
+    for event in events:
+        body = event.get("r") if event["k"] == "http" else event.get("p")
+        if event.get("src") == "cloud" or not isinstance(body, dict):
+            continue
+        host = httpx.URL(event["u"]).host if event["k"] == "http" else event["a"]
+        if body.get("sn"):
+            result[host] = body["sn"]
+    return result
+
+
+async def replay(path: Path, speed: float) -> dict:
+    header, events = load_trace(str(path))
+    trace = TraceReplay(events, speed)
+    cycle_times: list[float] = []
+    async with httpx.AsyncClient(transport=trace.transport) as client:
+        cloud = CloudService("replay@example.com", "replay", http_client=client)
+        # Pacing comes from the trace; don't let the limiter add its own.
+        cloud.rate_limiter = TokenBucket(float("inf"), float("inf"))
+        local = LocalService(http_client=client)
+        for ip, serial_number in lan_addresses(events).items():
+            local.devices.add(TerneoDevice(ip=ip, serial_number=serial_number))
+
+        # Every due device is fetched inline instead of served from the cache.
+        cache = TelemetryCache(ttl=0, max_stale=0)
+        router = TransportRouter(cloud, local, cache=cache)
+        scheduler = PollScheduler()
+        trace.start()
+        datagrams = asyncio.create_task(trace.play_datagrams(local._handle_datagram))
+        await cloud.initialize()
+        serial_numbers = [d.serial_number for d in cloud.cloud_devices]
+
+        while trace.now < trace.duration:
+            now = trace.now
+            due = scheduler.due(serial_numbers, now=now, window=POLL_WINDOW)
+            if due:
+                start = time.perf_counter()
+                telemetry = await router.get_telemetry_batch(due)
+                cycle_times.append(time.perf_counter() - start)
+                for serial_number in due:
+                    scheduler.record(serial_number, telemetry.get(serial_number), now)
+            next_poll = scheduler.next_poll()
+            wait = POLL_WINDOW if next_poll is None else next_poll - trace.now
+            await asyncio.sleep(max(min(wait, trace.duration - trace.now), 0) / speed)
+        datagrams.cancel()
+        await router.close()
+
+    def by_kind(counter: Counter) -> dict[str, int]:
+        # One line per endpoint rather than per device.
+        totals: Counter = Counter()
+        for kind, count in counter.items():
+            method, url, *rest = kind.split(" ")
+            parsed = httpx.URL(url)
+            if parsed.path.endswith("api.cgi"):
+                totals[" ".join(["lan", *rest])] += count
+            else:
+                totals[f"{method} {normalize_endpoint(parsed.path)}"] += count
+        return dict(sorted(totals.items()))
+
+    return {
+        "trace": str(path),
+        "recorded_at": header.get("started"),
+        "duration_s": round(trace.duration, 1),
+        "speed": speed,
+        "devices": len(serial_numbers),
+        "cycles": len(cycle_times),
+        "p50_ms": round(percentile(cycle_times, 50) * 1000, 2),
+        "p95_ms": round(percentile(cycle_times, 95) * 1000, 2),
+        "requests": {
+            "recorded": by_kind(trace.recorded),
+            "replayed": by_kind(trace.requests),
+        },
+        "unmatched": by_kind(trace.unmatched),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    report = asyncio.run(replay(arguments.trace, arguments.speed))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if arguments.json:
+        arguments.json.write_text(text + "\n")
@@ -0,0 +1,363 @@
+"""Load benchmarks for the Terneo networking layer.
+
+Runs the real CloudService, LocalService and the transport/scheduler/command
+stack used by the climate entities against the mock in mock_terneo.py and
+reports request counts, cycle latency percentiles, CPU time and peak memory.
+
+    python -m benchmarks.run --devices 10 100 1000
+    python -m benchmarks.run --scenario fleet --cloud-latency 0.2 --json out.json
+    python -m benchmarks.run --scenario fleet --devices 100 --record trace.jsonl.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass, field
+import json
+from pathlib import Path
+import random
+import sys
+import time
+import tracemalloc
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "terneo"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+from terneo_net.cache import TelemetryCache  # noqa: E402
+from terneo_net.cloud import CloudService  # noqa: E402
+from terneo_net.commands import CommandQueue  # noqa: E402
+from terneo_net.local import LocalService  # noqa: E402
+from terneo_net.networks import expand_networks  # noqa: E402
+from terneo_net.resilience import TokenBucket  # noqa: E402
+from terneo_net.scheduler import PollScheduler  # noqa: E402
+from terneo_net.trace import TraceRecorder  # noqa: E402
+from terneo_net.transport import TransportRouter  # noqa: E402
+
+from .mock_terneo import Faults, MockTerneo, make_fleet  # noqa: E402
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@dataclass
+class Result:
+    scenario: str
+    devices: int
+    cycles: int = 0
+    requests: dict[str, int] = field(default_factory=dict)
+    cycle_times: list[float] = field(default_factory=list)
+    cpu_seconds: float = 0.0
+    peak_memory_mb: float = 0.0
+    notes: str = ""
+
+    @property
+    def requests_per_cycle(self) -> float:
+        return sum(self.requests.values()) / self.cycles if self.cycles else 0.0
+
+    def summary(self) -> dict:
+        data = asdict(self)
+        del data["cycle_times"]
+        data["requests_per_cycle"] = round(self.requests_per_cycle, 2)
+        for pct in (50, 95, 99):
+            data[f"p{pct}_ms"] = round(percentile(self.cycle_times, pct) * 1000, 2)
+        return data
+
+
+class Measure:
+    """Collect CPU time and peak traced memory for a block."""
+
+    def __enter__(self) -> "Measure":
+        tracemalloc.start()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cpu_seconds = time.process_time() - self._cpu
+        self.peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+
+def make_cloud(mock: MockTerneo, client, rate_limit: bool) -> CloudService:
+    cloud = CloudService("bench@example.com", "secret", http_client=client)
+    if not rate_limit:
+        cloud.rate_limiter = TokenBucket(float("inf"), float("inf"))
+    return cloud
+
+
+async def scenario_cloud(count: int, args) -> Result:
+    """Full cloud poll of every device, plus a setpoint change on 10% of them."""
+    mock = MockTerneo(
+        make_fleet(count),
+        cloud_faults=Faults(args.cloud_latency, error_rate=args.cloud_errors),
+        page_size=args.page_size,
+    )
+    result = Result("cloud", count)
+    async with mock.client() as client:
+        cloud = make_cloud(mock, client, args.rate_limit)
+        await cloud.initialize()
+        serial_numbers = [d.serial_number for d in cloud.cloud_devices]
+        mock.reset_counters()
+        with Measure() as measure:
+            for _ in range(args.cycles):
+                start = time.perf_counter()
+                await cloud.get_telemetry_batch(serial_numbers)
+                await asyncio.gather(
+                    *(
+                        cloud.set_temperature(sn, 21)
+                        for sn in serial_numbers[: max(1, count // 10)]
+                    )
+                )
+                result.cycle_times.append(time.perf_counter() - start)
+                result.cycles += 1
+    result.requests = dict(mock.requests)
+    result.cpu_seconds = measure.cpu_seconds
+    result.peak_memory_mb = measure.peak_memory_mb
+    return result
+
+
+async def scenario_local(count: int, args) -> Result:
+    """UDP discovery of the fleet followed by concurrent cmd:4 polls.
+
+    Each cycle also reads the settings, which only costs a cmd:1 the first
+    time and after 10% of the devices got a new brightness.
+    """
+    mock = MockTerneo(
+        make_fleet(count),
+        lan_faults=Faults(args.lan_latency, error_rate=args.lan_errors),
+    )
+    result = Result("local", count)
+    async with mock.client() as client:
+        local = LocalService(http_client=client)
+        await local.start_discovery()
+        try:
+            start = time.perf_counter()
+            await mock.broadcast()
+            found = await local.wait_for_devices(count, timeout=10)
+            result.notes = (
+                f"discovered {len(found)}/{count} in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            serial_numbers = [d.serial_number for d in found]
+            changed = serial_numbers[: max(1, count // 10)]
+            with Measure() as measure:
+                for cycle in range(args.cycles):
+                    start = time.perf_counter()
+                    await asyncio.gather(
+                        *(local.get_telemetry(sn) for sn in serial_numbers),
+                        *(local.get_parameters(sn) for sn in serial_numbers),
+                    )
+                    if cycle == 0:
+                        await asyncio.gather(
+                            *(local.set_parameters(sn, brightness=3) for sn in changed)
+                        )
+                    result.cycle_times.append(time.perf_counter() - start)
+                    result.cycles += 1
+            parameters = await asyncio.gather(
+                *(local.get_parameters(sn) for sn in changed)
+            )
+            applied = sum(p is not None and p["brightness"] == 3 for p in parameters)
+            details = sum(local.get_details(sn) is not None for sn in serial_numbers)
+            result.notes += (
+                f", brightness read back on {applied}/{len(changed)}, "
+                f"details for {details}/{len(serial_numbers)}"
+            )
+        finally:
+            await local.close()
+    result.requests = dict(mock.requests)
+    result.cpu_seconds = measure.cpu_seconds
+    result.peak_memory_mb = measure.peak_memory_mb
+    return result
+
+
+async def scenario_fleet(count: int, args) -> Result:
+    """The stack behind the climate entities over simulated time.
+
+    Half of the devices are reachable on the LAN. Polls follow PollScheduler
+    with a virtual clock advanced in 5 s steps, devices change state as they
+    heat, and a few users drag setpoint sliders through CommandQueue.
+    """
+    rng = random.Random(1)
+    mock = MockTerneo(
+        make_fleet(count),
+        cloud_faults=Faults(args.cloud_latency, error_rate=args.cloud_errors),
+        lan_faults=Faults(args.lan_latency, error_rate=args.lan_errors),
+        page_size=args.page_size,
+    )
+    result = Result("fleet", count)
+    async with mock.client() as client:
+        cloud = make_cloud(mock, client, args.rate_limit)
+        local = LocalService(http_client=client)
+        if args.record:
+            cloud.recorder = local.recorder = TraceRecorder()
+        await cloud.initialize()
+        await local.start_discovery()
+        try:
+            lan_devices = mock.devices[: count // 2]
+            await mock.broadcast(lan_devices)
+            await local.wait_for_devices(len(lan_devices), timeout=10)
+
+            # The caches run on the real clock; the scheduler decides here, and
+            # every due device is fetched inline rather than in the background.
+            local.stale_after = 0
+            cache = TelemetryCache(ttl=0, max_stale=0)
+            router = TransportRouter(cloud, local, cache=cache)
+            commands = CommandQueue(router.apply, delay=0.01)
+            scheduler = PollScheduler()
+            serial_numbers = [d.serial_number for d in cloud.cloud_devices]
+            mock.reset_counters()
+
+            step = 5.0
+            steps = int(args.duration * 60 / step)
+            with Measure() as measure:
+                for index in range(steps):
+                    now = index * step
+                    for device in mock.devices:
+                        device.step(rng)
+                    if rng.random() < 0.05:
+                        # Someone drags a slider: several values in a burst.
+                        sn = rng.choice(serial_numbers)
+                        futures = [
+                            commands.submit(sn, temperature=t)
+                            for t in range(18, rng.randint(19, 26))
+                        ]
+                        await asyncio.gather(*futures)
+                        scheduler.boost(sn, now)
+
+                    due = scheduler.due(serial_numbers, now=now, window=step)
+                    if not due:
+                        continue
+                    start = time.perf_counter()
+                    telemetry = await router.get_telemetry_batch(due)
+                    for sn in due:
+                        scheduler.record(sn, telemetry.get(sn), now)
+                    result.cycle_times.append(time.perf_counter() - start)
+                    result.cycles += 1
+            result.notes = (
+                f"{args.duration:g} simulated min, "
+                f"{sum(mock.requests.values()) / args.duration:.1f} req/min"
+            )
+        finally:
+            await local.close()
+    if args.record:
+        local.recorder.save(str(args.record))
+    result.requests = dict(mock.requests)
+    result.cpu_seconds = measure.cpu_seconds
+    result.peak_memory_mb = measure.peak_memory_mb
+    return result
+
+
+async def scenario_scan(count: int, args) -> Result:
+    """Active cmd:4 scan of a range where broadcasts don't arrive.
+
+    Addresses without a thermostat fail after --scan-timeout like a real
+    connect timeout would, so the cycle time shows the effect of the scan
+    concurrency.
+    """
+    mock = MockTerneo(
+        make_fleet(count),
+        lan_faults=Faults(args.lan_latency, error_rate=args.lan_errors),
+        unreachable_delay=args.scan_timeout,
+    )
+    result = Result("scan", count)
+    addresses = expand_networks(args.scan_networks)
+    expected = {d.serial_number for d in mock.devices}
+    async with mock.client() as client:
+        local = LocalService(http_client=client)
+        with Measure() as measure:
+            for _ in range(args.cycles):
+                local.devices.clear()
+                start = time.perf_counter()
+                found = await local.scan(
+                    addresses, expected, timeout=args.scan_timeout, http_client=client
+                )
+                result.cycle_times.append(time.perf_counter() - start)
+                result.cycles += 1
+        await local.close()
+    result.notes = f"found {len(found)}/{count} in {len(addresses)} addresses"
+    result.requests = dict(mock.requests)
+    result.cpu_seconds = measure.cpu_seconds
+    result.peak_memory_mb = measure.peak_memory_mb
+    return result
+
+
+SCENARIOS = {
+    "cloud": scenario_cloud,
+    "local": scenario_local,
+    "fleet": scenario_fleet,
+    "scan": scenario_scan,
+}
+
+
+def print_table(results: list[Result]) -> None:
+    header = (
+        f"{'scenario':<8} {'devices':>7} {'cycles':>6} {'req/cycle':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu s':>7} {'mem MB':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        s = result.summary()
+        print(
+            f"{s['scenario']:<8} {s['devices']:>7} {s['cycles']:>6} "
+            f"{s['requests_per_cycle']:>9.1f} {s['p50_ms']:>8.1f} "
+            f"{s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} "
+            f"{s['cpu_seconds']:>7.2f} {s['peak_memory_mb']:>7.1f}"
+            + (f"  {s['notes']}" if s["notes"] else "")
+        )
+
+
+async def main(args) -> list[Result]:
+    results = []
+    for scenario in args.scenario:
+        for count in args.devices:
+            results.append(await SCENARIOS[scenario](count, args))
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--devices", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument(
+        "--duration", type=float, default=30, help="simulated minutes (fleet)"
+    )
+    parser.add_argument("--cloud-latency", type=float, default=0.05)
+    parser.add_argument("--cloud-errors", type=float, default=0.0)
+    parser.add_argument("--lan-latency", type=float, default=0.01)
+    parser.add_argument("--lan-errors", type=float, default=0.0)
+    parser.add_argument(
+        "--page-size", type=int, help="paginate the mock cloud device list"
+    )
+    parser.add_argument(
+        "--scan-networks", nargs="+", default=["127.1.0.0/22"], help="scan"
+    )
+    parser.add_argument("--scan-timeout", type=float, default=1.0, help="scan")
+    parser.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="keep the per-account cloud rate limiter enabled",
+    )
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument(
+        "--record", type=Path, help="save a trace of the fleet scenario here"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    results = asyncio.run(main(arguments))
+    print_table(results)
+    if arguments.json:
+        arguments.json.write_text(
+            json.dumps([r.summary() for r in results], indent=2) + "\n"
+        )
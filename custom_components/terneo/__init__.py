@@ -2,30 +2,158 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Coroutine
+import logging
+from typing import Any
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_DEVICES,
+    CONF_EMAIL,
+    CONF_PASSWORD,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.httpx_client import get_async_client
 from homeassistant.helpers.typing import ConfigType
 
-DOMAIN = "terneo"
+from . import terneo_net
+from .const import CONF_SCAN_NETWORKS, DOMAIN, PLATFORMS
+from .coordinator import TerneoCoordinator
+from .inventory import (
+    RECONCILE_INTERVAL,
+    SCAN_DELAY,
+    SCAN_INTERVAL,
+    InventoryStore,
+    async_reconcile_devices,
+    async_scan_lan,
+)
+from .services import async_setup_services
+from .terneo_net.commands import CommandQueue
+from .terneo_net.exceptions import TerneoConnectionError
+from .terneo_net.metrics import Metrics
+from .terneo_net.models import CloudDevice
+
+_LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    hass.data[DOMAIN] = {
-        CONF_EMAIL: entry.data[CONF_EMAIL],
-        CONF_PASSWORD: entry.data[CONF_PASSWORD],
-    }
+    # The transports are only imported once an entry is set up, off the loop.
+    await hass.async_add_import_executor_job(terneo_net.load_transports)
+    # All entries share Home Assistant's pooled client; services don't own it.
+    http_client = get_async_client(hass)
+    metrics = Metrics()
+    cloud = terneo_net.CloudService(
+        entry.data[CONF_EMAIL],
+        entry.data[CONF_PASSWORD],
+        entry.data.get(CONF_ACCESS_TOKEN),
+        http_client=http_client,
+        metrics=metrics,
+    )
+
+    @callback
+    def _store_token(token):
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_ACCESS_TOKEN: token}
+        )
+
+    cloud.session.on_token_changed.append(_store_token)
+
+    inventory = InventoryStore(hass, entry)
+    cached_devices = await inventory.async_load()
+    seeded = False
+    if not cached_devices and CONF_DEVICES in entry.data:
+        # The config flow just listed the devices: move them to the store.
+        cached_devices = [CloudDevice(**device) for device in entry.data[CONF_DEVICES]]
+        await inventory.async_save(cached_devices)
+        hass.config_entries.async_update_entry(
+            entry,
+            data={k: v for k, v in entry.data.items() if k != CONF_DEVICES},
+        )
+        seeded = True
+    if cached_devices:
+        # Create entities right away; the cloud is contacted in the background.
+        cloud.devices.replace(cached_devices)
+    else:
+        try:
+            await cloud.initialize()
+        except TerneoConnectionError as err:
+            raise ConfigEntryNotReady(f"Error initializing Terneo: {err}") from err
+        await inventory.async_save(cloud.cloud_devices)
+
+    local = terneo_net.LocalService(http_client=http_client, metrics=metrics)
+    try:
+        await local.initialize()
+    except OSError as err:
+        _LOGGER.warning("LAN discovery unavailable, using cloud only: %s", err)
+        local = None
+
+    transport = terneo_net.TransportRouter(cloud, local)
+    commands = CommandQueue(transport.apply)
+    coordinator = TerneoCoordinator(hass, transport, commands, metrics)
+    transport.on_refresh.append(coordinator.async_refreshed)
+    if local:
+        local.on_telemetry.append(coordinator.async_push_telemetry)
+
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
 
     # Use async_forward_entry_setups to load platforms
-    await hass.config_entries.async_forward_entry_setups(entry, ["climate"])
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    async def _async_reconcile(_now=None) -> None:
+        await async_reconcile_devices(hass, entry, coordinator, inventory)
+
+    async def _async_scan(_now=None, delay: float = 0) -> None:
+        await async_scan_lan(entry, coordinator, inventory, delay)
+
+    scan_networks = entry.options.get(CONF_SCAN_NETWORKS, "")
+
+    async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+        # Token refreshes update the entry too; only new ranges need a scan.
+        nonlocal scan_networks
+        if entry.options.get(CONF_SCAN_NETWORKS, "") == scan_networks:
+            return
+        scan_networks = entry.options.get(CONF_SCAN_NETWORKS, "")
+        entry.async_create_background_task(
+            hass, _async_scan(), f"{DOMAIN}_scan_{entry.entry_id}"
+        )
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_reconcile, RECONCILE_INTERVAL)
+    )
+    entry.async_on_unload(async_track_time_interval(hass, _async_scan, SCAN_INTERVAL))
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+    startup = [coordinator.async_refresh(), _async_scan(delay=SCAN_DELAY)]
+    if cached_devices and not seeded:
+        # Entities came from the cache; check the account for changes meanwhile.
+        startup.append(_async_reconcile())
+    entry.async_create_background_task(
+        hass, _async_start(*startup), f"{DOMAIN}_start_{entry.entry_id}"
+    )
     return True
 
 
+async def _async_start(*steps: Coroutine[Any, Any, None]) -> None:
+    """Run the first telemetry poll and the other start-up work together."""
+    await asyncio.gather(*steps)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Handle unloading the entry (e.g., when the user removes it)
-    await hass.config_entries.async_forward_entry_unload(entry, "climate")
-    return True
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        coordinator: TerneoCoordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await InventoryStore(hass, entry).async_remove()
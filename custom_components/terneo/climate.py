@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import logging
 
 from homeassistant.components.climate import (
@@ -9,15 +9,14 @@ from homeassistant.components.climate import (
     HVACAction,
     HVACMode,
 )
-from homeassistant.const import (
-    ATTR_TEMPERATURE,
-    CONF_EMAIL,
-    CONF_PASSWORD,
-    UnitOfTemperature,
-)
+from homeassistant.const import ATTR_TEMPERATURE, UnitOfTemperature
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import DOMAIN
-from .terneo_net.cloud import CloudDevice, CloudService
+from .const import DOMAIN, SIGNAL_DEVICES_ADDED
+from .coordinator import TerneoCoordinator
+from .terneo_net.models import CloudDevice, TerneoTelemetry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,36 +30,41 @@ SUPPORT_HVAC = [HVACMode.HEAT, HVACMode.OFF]
 MIN_TEMPERATURE = 5
 MAX_TEMPERATURE = 45
 
-MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=2)
-
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    email = hass.data[DOMAIN][CONF_EMAIL]
-    password = hass.data[DOMAIN][CONF_PASSWORD]
-
-    cloud = CloudService(email, password)
-
-    try:
-        await cloud.initialize()
-    except Exception as e:
-        _LOGGER.error(f"Error initializing CloudService: {e}")
-        return
-
-    entities = [TerneoClimateEntity(device, cloud) for device in cloud.cloud_devices]
-    _LOGGER.debug(f"Adding entities: {entities}")
-    async_add_entities(entities, True)
+    coordinator: TerneoCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    @callback
+    def async_add_devices(devices: list[CloudDevice]) -> None:
+        entities = [TerneoClimateEntity(coordinator, device) for device in devices]
+        _LOGGER.debug(f"Adding entities: {entities}")
+        async_add_entities(entities)
+
+    async_add_devices(coordinator.transport.cloud.cloud_devices)
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_DEVICES_ADDED.format(entry.entry_id), async_add_devices
+        )
+    )
 
 
-class TerneoClimateEntity(ClimateEntity):
-    def __init__(self, cloud_device: CloudDevice, cloud_service: CloudService) -> None:
-        super().__init__()
-        self._last_command_time = datetime.min
+class TerneoClimateEntity(CoordinatorEntity[TerneoCoordinator], ClimateEntity):
+    def __init__(
+        self,
+        coordinator: TerneoCoordinator,
+        cloud_device: CloudDevice,
+    ) -> None:
+        super().__init__(coordinator)
 
         self._target_temperature = None
         self._current_temperature = None
+        # Snapshot the state was last built from, to skip identical updates.
+        self._telemetry: TerneoTelemetry | None = None
+        self._stale_since: float | None = None
+        self._was_available: bool | None = None
 
         self._cloud_device = cloud_device
-        self._cloud_service = cloud_service
+        self._commands = coordinator.commands
 
         self._hvac_mode = HVACMode.OFF
         self._hvac_action = HVACAction.OFF
@@ -107,20 +111,79 @@ class TerneoClimateEntity(ClimateEntity):
             "sw_version": self._cloud_device.firmware_version,
         }
 
+    @property
+    def extra_state_attributes(self):
+        """Tell whether the state is last known data kept through an outage."""
+        return {
+            "stale": self._stale_since is not None,
+            "stale_since": None
+            if self._stale_since is None
+            else datetime.fromtimestamp(self._stale_since, timezone.utc).isoformat(),
+        }
+
+    @property
+    def available(self) -> bool:
+        return (
+            super().available
+            and self.coordinator.data is not None
+            and self._cloud_device.serial_number in self.coordinator.data
+        )
+
     async def async_added_to_hass(self):
         """When entity is added to hass."""
-        await self._async_update_telemetry()
+        await super().async_added_to_hass()
+        self._update_from_telemetry()
+        self._was_available = self.available
+        self._stale_since = self.coordinator.transport.cache.stale_since(
+            self._cloud_device.serial_number
+        )
 
-    async def _async_update_telemetry(self):
-        """Update the state from the provided telemetry data."""
-        telemetry = await self._cloud_service.get_telemetry(
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator, writing only real changes."""
+        available = self.available
+        stale_since = self.coordinator.transport.cache.stale_since(
+            self._cloud_device.serial_number
+        )
+        renamed = self._sync_cloud_device()
+        if (
+            not renamed
+            and available == self._was_available
+            and stale_since == self._stale_since
+            and self._current_telemetry() == self._telemetry
+        ):
+            self.coordinator.metrics.record_event("state_write_skipped")
+            return
+        self._update_from_telemetry()
+        self._was_available = available
+        self._stale_since = stale_since
+        self.coordinator.metrics.record_event("state_write")
+        self.async_write_ha_state()
+
+    def _sync_cloud_device(self) -> bool:
+        """Pick up a new name of the device from the account's device list."""
+        cloud_device = self.coordinator.transport.cloud.devices.get(
             self._cloud_device.serial_number
         )
+        if cloud_device is None or cloud_device == self._cloud_device:
+            return False
+        self._cloud_device = cloud_device
+        self._attr_name = cloud_device.name
+        return True
+
+    def _current_telemetry(self) -> TerneoTelemetry | None:
+        return (self.coordinator.data or {}).get(self._cloud_device.serial_number)
+
+    def _update_from_telemetry(self):
+        """Update the state from the coordinator's telemetry data."""
+        telemetry = self._current_telemetry()
+        self._telemetry = telemetry
         if telemetry:
-            if telemetry.current_temperature < MIN_TEMPERATURE:
+            current_temperature = telemetry.current_temperature
+            if current_temperature is None or current_temperature < MIN_TEMPERATURE:
                 self._current_temperature = None
             else:
-                self._current_temperature = telemetry.current_temperature
+                self._current_temperature = current_temperature
             self._target_temperature = telemetry.target_temperature
             self._hvac_mode = HVACMode.OFF if telemetry.power_off else HVACMode.HEAT
             if telemetry.power_off:
@@ -136,45 +199,33 @@ class TerneoClimateEntity(ClimateEntity):
         if temperature is None:
             return
 
-        try:
-            success = await self._cloud_service.set_temperature(
-                self._cloud_device.serial_number, temperature
-            )
-            if success:
-                self._last_command_time = datetime.now()
-                self._target_temperature = temperature
-                self.async_write_ha_state()
-            else:
-                _LOGGER.error(
-                    f"Failed to update temperature to {temperature} for device {self.name}"
-                )
-        except Exception as e:
+        success = await self._async_submit(temperature=int(temperature))
+        if not success:
             _LOGGER.error(
-                f"Error setting temperature to {temperature} for device {self.name}: {e}"
+                f"Failed to update temperature to {temperature} for device {self.name}"
             )
 
     async def async_set_hvac_mode(self, hvac_mode):
         """Set new target hvac mode."""
-        try:
-            is_off = hvac_mode == HVACMode.OFF
-            success = await self._cloud_service.power_on_off(
-                self._cloud_device.serial_number, is_off
-            )
-            if success:
-                self._last_command_time = datetime.now()
-                self._hvac_mode = HVACMode.OFF if is_off else HVACMode.HEAT
-                self._hvac_action = HVACAction.OFF if is_off else HVACAction.IDLE
-                self.async_write_ha_state()
-            else:
-                _LOGGER.error(
-                    f"Failed to update HVAC mode to {hvac_mode} for device {self.name}"
-                )
-        except Exception as e:
+        success = await self._async_submit(power_off=hvac_mode == HVACMode.OFF)
+        if not success:
             _LOGGER.error(
-                f"Error setting HVAC mode to {hvac_mode} for device {self.name}: {e}"
+                f"Failed to update HVAC mode to {hvac_mode} for device {self.name}"
             )
 
-    async def async_update(self):
-        """Fetch new state data for this device."""
-        if datetime.now() - self._last_command_time > MIN_TIME_BETWEEN_UPDATES:
-            await self._async_update_telemetry()
+    async def _async_submit(
+        self, temperature: int | None = None, power_off: bool | None = None
+    ) -> bool:
+        """Queue a command, showing its outcome until a poll confirms it."""
+        serial_number = self._cloud_device.serial_number
+        # Submitted first so that the device is busy and polls keep the
+        # optimistic state instead of the one read before the write.
+        result = self._commands.submit(serial_number, temperature, power_off)
+        self.coordinator.async_set_optimistic(serial_number, temperature, power_off)
+        self.coordinator.async_update_listeners()
+        success = await result
+        if success:
+            self.coordinator.async_poll_soon(serial_number)
+        else:
+            self.coordinator.async_discard_optimistic(serial_number)
+        return success
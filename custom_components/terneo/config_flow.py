@@ -1,12 +1,21 @@
+from dataclasses import asdict
 import logging
 
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_DEVICES,
+    CONF_EMAIL,
+    CONF_PASSWORD,
+)
+from homeassistant.core import callback
+from homeassistant.helpers.httpx_client import get_async_client
 
-from . import DOMAIN
-from .terneo_net.cloud import CloudService
+from . import terneo_net
+from .const import CONF_LOAD_POWER, CONF_SCAN_NETWORKS, DEFAULT_LOAD_POWER, DOMAIN
+from .terneo_net.networks import expand_networks
 
 DATA_SCHEMA = vol.Schema(
     {
@@ -19,6 +28,11 @@ _LOGGER = logging.getLogger(__name__)
 
 
 class TerneoConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return TerneoOptionsFlow()
+
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
         errors = {}
@@ -26,17 +40,17 @@ class TerneoConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             email = user_input[CONF_EMAIL]
             password = user_input[CONF_PASSWORD]
 
-            valid_login = await self._validate_login(email, password)
-            if valid_login:
-                # Set unique ID and check if already configured
-                await self.async_set_unique_id(user_input[CONF_EMAIL])
-
-                for entry in self._async_current_entries():
-                    if entry.unique_id == user_input[CONF_EMAIL]:
-                        return self.async_abort(reason="already_configured_account")
+            # Set unique ID and check if already configured
+            await self.async_set_unique_id(email)
+            for entry in self._async_current_entries():
+                if entry.unique_id == email:
+                    return self.async_abort(reason="already_configured_account")
 
+            session = await self._validate_login(email, password)
+            if session is not None:
+                # Setup starts from the token and devices fetched here.
                 return self.async_create_entry(
-                    title=user_input[CONF_EMAIL], data=user_input
+                    title=email, data={**user_input, **session}
                 )
             else:
                 errors["base"] = "invalid_auth"
@@ -45,11 +59,56 @@ class TerneoConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=DATA_SCHEMA, errors=errors
         )
 
-    @staticmethod
-    async def _validate_login(email: str, password: str) -> bool:
+    async def _validate_login(self, email: str, password: str) -> dict | None:
+        """Log in and list the devices; returns the entry data to keep."""
+        await self.hass.async_add_import_executor_job(terneo_net.load_transports)
+        cloud_service = terneo_net.CloudService(
+            email, password, http_client=get_async_client(self.hass)
+        )
         try:
-            cloud_service = CloudService(email, password)
-            return await cloud_service.auth()
+            if not await cloud_service.auth():
+                return None
+            session = {CONF_ACCESS_TOKEN: cloud_service.access_token}
+            devices = await cloud_service.fetch_devices()
+            if devices:
+                session[CONF_DEVICES] = [asdict(device) for device in devices]
+            return session
         except Exception as ex:
             _LOGGER.error("Failed to validate login: %s", ex)
-            return False
+            return None
+        finally:
+            await cloud_service.close()
+
+
+class TerneoOptionsFlow(config_entries.OptionsFlow):
+    async def async_step_init(self, user_input=None):
+        """Heating statistics and LAN scanning settings."""
+        errors = {}
+        if user_input is not None:
+            try:
+                expand_networks(user_input.get(CONF_SCAN_NETWORKS, "").split(","))
+            except ValueError as err:
+                _LOGGER.debug("Invalid scan networks: %s", err)
+                errors[CONF_SCAN_NETWORKS] = "invalid_networks"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        load_power = options.get(CONF_LOAD_POWER, DEFAULT_LOAD_POWER)
+        # Shown but not defaulted, so that clearing the field removes them.
+        scan_networks = (user_input or options).get(CONF_SCAN_NETWORKS, "")
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_LOAD_POWER, default=load_power): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=10000)
+                    ),
+                    vol.Optional(
+                        CONF_SCAN_NETWORKS,
+                        description={"suggested_value": scan_networks},
+                    ): str,
+                }
+            ),
+            errors=errors,
+        )
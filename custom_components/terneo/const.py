@@ -0,0 +1,13 @@
+"""Constants for the Terneo integration."""
+
+DOMAIN = "terneo"
+
+PLATFORMS = ["climate", "sensor"]
+
+# Dispatched with the entry id and a list of new CloudDevice objects.
+SIGNAL_DEVICES_ADDED = f"{DOMAIN}_devices_added_{{}}"
+
+CONF_LOAD_POWER = "load_power"
+DEFAULT_LOAD_POWER = 0
+# Comma separated CIDR ranges probed for thermostats that don't broadcast.
+CONF_SCAN_NETWORKS = "scan_networks"
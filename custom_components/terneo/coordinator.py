@@ -0,0 +1,244 @@
+"""Account-wide telemetry coordinator for the Terneo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+from datetime import timedelta
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import DOMAIN
+from .terneo_net.commands import CommandQueue
+from .terneo_net.exceptions import TerneoConnectionError
+from .terneo_net.history import TelemetryHistory
+from .terneo_net.metrics import Metrics
+from .terneo_net.models import TerneoTelemetry
+from .terneo_net.scheduler import PollScheduler
+
+if TYPE_CHECKING:
+    from .terneo_net.transport import TransportRouter
+
+_LOGGER = logging.getLogger(__name__)
+
+UPDATE_INTERVAL = timedelta(seconds=60)
+MIN_UPDATE_INTERVAL = timedelta(seconds=5)
+
+
+class TerneoCoordinator(DataUpdateCoordinator[dict[str, TerneoTelemetry]]):
+    """Fetch telemetry for the devices of an account that are due for a poll.
+
+    Each device has its own adaptive interval kept by PollScheduler; the
+    coordinator wakes up when the earliest device is due and fetches all due
+    devices in one batch.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        transport: TransportRouter,
+        commands: CommandQueue,
+        metrics: Metrics,
+    ) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=UPDATE_INTERVAL,
+        )
+        self.transport = transport
+        self.commands = commands
+        self.metrics = metrics
+        self.scheduler = PollScheduler()
+        self.history: dict[str, TelemetryHistory] = {}
+        # Load power in watts set on each thermostat, read once over the LAN;
+        # None when the thermostat didn't report one.
+        self.load_power: dict[str, float | None] = {}
+        self._unsub_poll: CALLBACK_TYPE | None = None
+
+    async def _async_update_data(self) -> dict[str, TerneoTelemetry]:
+        serial_numbers = [d.serial_number for d in self.transport.cloud.cloud_devices]
+        # Devices due shortly after are polled along with the others.
+        due = self.scheduler.due(
+            serial_numbers, window=MIN_UPDATE_INTERVAL.total_seconds()
+        )
+        data = dict(self.data or {})
+        if not due:
+            self._reschedule()
+            return data
+
+        start = time.monotonic()
+        error: Exception | None = None
+        try:
+            telemetry = await self.transport.get_telemetry_batch(due)
+        except TerneoConnectionError as err:
+            error = err
+            telemetry = {}
+        finally:
+            self.metrics.record_poll_cycle(time.monotonic() - start)
+
+        now = time.monotonic()
+        cache = self.transport.cache
+        for serial_number in due:
+            if self.transport.is_refreshing(serial_number):
+                # Served from the cache; the refresh reports when it's done.
+                continue
+            sample = telemetry.get(serial_number)
+            if sample is None:
+                # Nothing to serve, not even cached data: only this device
+                # becomes unavailable.
+                data.pop(serial_number, None)
+            elif cache.stale_since(serial_number) is not None:
+                # Last known good data; retry like a failed poll.
+                sample = None
+            self.scheduler.record(serial_number, sample, now)
+            if sample is not None:
+                self._record_history(serial_number, sample, now)
+        # Keep the optimistic state of devices until their commands settle.
+        data.update(
+            (sn, sample)
+            for sn, sample in telemetry.items()
+            if sn not in data or not self.commands.is_busy(sn)
+        )
+        await self._async_read_load_power(
+            [sn for sn in due if sn in telemetry and sn not in self.load_power]
+        )
+        self._reschedule()
+        if not data:
+            if error is not None:
+                raise UpdateFailed(
+                    f"Error communicating with Terneo: {error}"
+                ) from error
+            raise UpdateFailed("No telemetry received from Terneo")
+        return data
+
+    async def _async_read_load_power(self, serial_numbers: list[str]) -> None:
+        local = self.transport.local
+        if local is None:
+            return
+        # Cloud-only devices are asked once they show up on the LAN.
+        serial_numbers = [sn for sn in serial_numbers if local.get_device(sn)]
+        parameters = await asyncio.gather(
+            *(self.transport.get_parameters(sn) for sn in serial_numbers)
+        )
+        for serial_number, values in zip(serial_numbers, parameters):
+            self.load_power[serial_number] = (values or {}).get("power") or None
+
+    def _record_history(
+        self, serial_number: str, telemetry: TerneoTelemetry, now: float
+    ) -> None:
+        history = self.history.get(serial_number)
+        if history is None:
+            history = self.history[serial_number] = TelemetryHistory()
+        history.add(telemetry, now)
+
+    def _reschedule(self) -> None:
+        """Wake up next time when the earliest device is due."""
+        next_poll = self.scheduler.next_poll()
+        if next_poll is None:
+            self.update_interval = UPDATE_INTERVAL
+            return
+        self.update_interval = max(
+            timedelta(seconds=next_poll - time.monotonic()), MIN_UPDATE_INTERVAL
+        )
+
+    @callback
+    def async_push_telemetry(
+        self, serial_number: str, telemetry: TerneoTelemetry
+    ) -> None:
+        """Apply telemetry a device broadcast on the LAN without polling it."""
+        if serial_number not in self.transport.cloud.devices:
+            # A neighbour's thermostat or one of another account.
+            return
+        now = time.monotonic()
+        self.scheduler.record(serial_number, telemetry, now)
+        self._record_history(serial_number, telemetry, now)
+        self.transport.cache.put(serial_number, telemetry, now)
+        if self.data is None:
+            self.data = {}
+        elif serial_number in self.data and self.commands.is_busy(serial_number):
+            return
+        self.data[serial_number] = telemetry
+        self.async_update_listeners()
+
+    @callback
+    def async_refreshed(
+        self, serial_number: str, telemetry: TerneoTelemetry | None
+    ) -> None:
+        """Apply the outcome of a background refresh of cached telemetry."""
+        if telemetry is not None:
+            self.async_push_telemetry(serial_number, telemetry)
+            return
+        # Retry like a failed poll; entities pick up the stale state.
+        self.scheduler.record(serial_number, None)
+        self.async_update_listeners()
+
+    @callback
+    def async_set_optimistic(
+        self,
+        serial_number: str,
+        temperature: int | None = None,
+        power_off: bool | None = None,
+    ) -> None:
+        """Show the state a command is expected to lead to.
+
+        Polls and broadcasts don't replace it while the command is busy; call
+        async_update_listeners() once all changes are made.
+        """
+        telemetry = (self.data or {}).get(serial_number)
+        if telemetry is None:
+            return
+        changes = {}
+        if temperature is not None:
+            changes["target_temperature"] = temperature
+        if power_off is not None:
+            changes["power_off"] = power_off
+            if power_off:
+                changes["heating"] = False
+        self.data[serial_number] = replace(telemetry, **changes)
+
+    @callback
+    def async_discard_optimistic(self, serial_number: str) -> None:
+        """Go back to the last telemetry read from a device whose write failed."""
+        telemetry = self.transport.cache.get(serial_number)
+        if telemetry is not None and self.data is not None:
+            self.data[serial_number] = telemetry
+        self.async_update_listeners()
+
+    @callback
+    def async_poll_soon(self, serial_number: str) -> None:
+        """Poll a device shortly after it was sent a command."""
+        self.scheduler.boost(serial_number)
+        if self._unsub_poll:
+            self._unsub_poll()
+        self._unsub_poll = async_call_later(
+            self.hass, self.scheduler.min_interval, self._async_poll_due
+        )
+
+    async def _async_poll_due(self, _now) -> None:
+        self._unsub_poll = None
+        await self.async_request_refresh()
+
+    @callback
+    def async_remove_device(self, serial_number: str) -> None:
+        """Forget everything kept about a device that left the account."""
+        self.scheduler.remove(serial_number)
+        self.history.pop(serial_number, None)
+        self.load_power.pop(serial_number, None)
+        self.transport.cache.remove(serial_number)
+        if self.data is not None:
+            self.data.pop(serial_number, None)
+
+    async def async_shutdown(self) -> None:
+        """Stop polling, send pending commands and release the services."""
+        if self._unsub_poll:
+            self._unsub_poll()
+            self._unsub_poll = None
+        await super().async_shutdown()
+        await self.commands.flush()
+        await self.transport.close()
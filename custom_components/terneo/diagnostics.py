@@ -0,0 +1,45 @@
+"""Diagnostics support for the Terneo integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import TerneoCoordinator
+
+TO_REDACT = {CONF_EMAIL, CONF_PASSWORD, CONF_ACCESS_TOKEN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return request, polling and discovery statistics for a config entry."""
+    coordinator: TerneoCoordinator = hass.data[DOMAIN][entry.entry_id]
+    transport = coordinator.transport
+    breaker = transport.cloud.circuit_breaker
+
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+        },
+        "devices": {
+            "cloud": len(transport.cloud.devices),
+            "local": len(transport.local.devices) if transport.local else None,
+            "stale": sum(
+                transport.cache.stale_since(sn) is not None
+                for sn in (coordinator.data or {})
+            ),
+        },
+        "circuit_breaker": {"state": breaker.state, "failures": breaker.failures},
+        "metrics": coordinator.metrics.as_dict(),
+        "transport": transport.all_stats(),
+    }
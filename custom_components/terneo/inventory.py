@@ -0,0 +1,182 @@
+"""Persistent cache of the devices of a Terneo account."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from datetime import timedelta
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+
+from .const import CONF_SCAN_NETWORKS, DOMAIN, SIGNAL_DEVICES_ADDED
+from .coordinator import TerneoCoordinator
+from .terneo_net.exceptions import TerneoConnectionError
+from .terneo_net.models import CloudDevice
+from .terneo_net.networks import expand_networks
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+RECONCILE_INTERVAL = timedelta(hours=1)
+SCAN_INTERVAL = timedelta(minutes=30)
+# Broadcasts usually find devices within this time; only the rest is probed.
+SCAN_DELAY = 15.0
+
+
+class InventoryStore:
+    """Device inventory of one config entry kept in Home Assistant storage.
+
+    Besides the cloud device list it remembers the LAN addresses found by
+    scans, keyed by serial number.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self._store: Store[dict] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}"
+        )
+        self._data: dict = {}
+
+    @property
+    def addresses(self) -> dict[str, str]:
+        return dict(self._data.get("addresses", {}))
+
+    async def async_load(self) -> list[CloudDevice] | None:
+        self._data = await self._store.async_load() or {}
+        if not self._data:
+            return None
+        try:
+            return [CloudDevice(**device) for device in self._data["devices"]]
+        except (KeyError, TypeError) as err:
+            _LOGGER.warning("Ignoring invalid device cache: %s", err)
+            return None
+
+    async def async_save(self, devices: list[CloudDevice]) -> None:
+        self._data["devices"] = [asdict(device) for device in devices]
+        await self._store.async_save(self._data)
+
+    async def async_save_addresses(self, addresses: dict[str, str]) -> None:
+        self._data["addresses"] = addresses
+        await self._store.async_save(self._data)
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
+
+
+async def async_reconcile_devices(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: TerneoCoordinator,
+    inventory: InventoryStore,
+) -> None:
+    """Apply changes of the account's device list without reloading the entry.
+
+    New devices get entities, removed ones are dropped from the device
+    registry together with their entities, and renamed ones are updated.
+    """
+    cloud = coordinator.transport.cloud
+    try:
+        devices = await cloud.fetch_devices()
+    except TerneoConnectionError as err:
+        _LOGGER.warning("Could not refresh the Terneo device list: %s", err)
+        return
+    if not devices:
+        # A failed or empty listing must not remove every device.
+        return
+
+    old = {d.serial_number: d for d in cloud.cloud_devices}
+    new = {d.serial_number: d for d in devices}
+    if new == old:
+        return
+    cloud.devices.replace(devices)
+    await inventory.async_save(devices)
+
+    added = [new[sn] for sn in new.keys() - old.keys()]
+    removed = old.keys() - new.keys()
+    changed = [new[sn] for sn in new.keys() & old.keys() if new[sn] != old[sn]]
+    _LOGGER.info(
+        "Terneo devices of %s changed: %d added, %d removed, %d updated",
+        entry.title,
+        len(added),
+        len(removed),
+        len(changed),
+    )
+
+    device_registry = dr.async_get(hass)
+    for serial_number in removed:
+        coordinator.async_remove_device(serial_number)
+        device = device_registry.async_get_device(
+            identifiers={(DOMAIN, serial_number)}
+        )
+        if device is not None:
+            device_registry.async_update_device(
+                device.id, remove_config_entry_id=entry.entry_id
+            )
+    for cloud_device in changed:
+        device = device_registry.async_get_device(
+            identifiers={(DOMAIN, cloud_device.serial_number)}
+        )
+        if device is not None:
+            device_registry.async_update_device(
+                device.id,
+                name=cloud_device.name,
+                model=cloud_device.model,
+                sw_version=cloud_device.firmware_version,
+            )
+    if added:
+        async_dispatcher_send(hass, SIGNAL_DEVICES_ADDED.format(entry.entry_id), added)
+        await coordinator.async_request_refresh()
+    coordinator.async_update_listeners()
+
+
+async def async_scan_lan(
+    entry: ConfigEntry,
+    coordinator: TerneoCoordinator,
+    inventory: InventoryStore,
+    delay: float = 0,
+) -> None:
+    """Probe for devices of the account that LAN discovery hasn't found.
+
+    Addresses found by earlier scans are tried first, then the ranges set in
+    the options. Devices that answer are used locally from then on.
+    """
+    local = coordinator.transport.local
+    if local is None:
+        return
+    cloud = coordinator.transport.cloud
+    serial_numbers = {d.serial_number for d in cloud.cloud_devices}
+    if delay:
+        await local.wait_for_devices(len(serial_numbers), delay)
+    missing = {sn for sn in serial_numbers if local.get_device(sn) is None}
+    if not missing:
+        return
+
+    addresses = inventory.addresses
+    known = [ip for sn, ip in addresses.items() if sn in missing]
+    networks = entry.options.get(CONF_SCAN_NETWORKS, "")
+    if not known and not networks:
+        return
+
+    # Creating a client loads certificates; keep it off the event loop.
+    client = await coordinator.hass.async_add_executor_job(local.create_scan_client)
+    try:
+        found = await local.scan(known, missing, http_client=client) if known else []
+        missing.difference_update(d.serial_number for d in found)
+        if missing and networks:
+            try:
+                targets = expand_networks(networks.split(","))
+            except ValueError as err:
+                _LOGGER.warning("Invalid Terneo scan networks %s: %s", networks, err)
+            else:
+                found += await local.scan(targets, missing, http_client=client)
+    finally:
+        await client.aclose()
+    if not found:
+        return
+
+    _LOGGER.debug("LAN scan found %s", ", ".join(str(d) for d in found))
+    addresses.update((d.serial_number, d.ip) for d in found)
+    await inventory.async_save_addresses(addresses)
@@ -0,0 +1,261 @@
+"""Heating statistics per thermostat and diagnostic request statistics."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfEnergy,
+    UnitOfTime,
+)
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import CONF_LOAD_POWER, DEFAULT_LOAD_POWER, DOMAIN, SIGNAL_DEVICES_ADDED
+from .coordinator import TerneoCoordinator
+from .terneo_net.history import TelemetryHistory
+from .terneo_net.metrics import Metrics
+from .terneo_net.models import CloudDevice
+
+
+def _milliseconds(value: float | None) -> float | None:
+    return None if value is None else round(value * 1000, 1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class TerneoMetricDescription(SensorEntityDescription):
+    value_fn: Callable[[Metrics], float | int | None]
+
+
+@dataclass(frozen=True, kw_only=True)
+class TerneoHistoryDescription(SensorEntityDescription):
+    # Called with the device history and its load power in watts.
+    value_fn: Callable[[TelemetryHistory, float], float | None]
+
+
+def _duty_cycle(history: TelemetryHistory, _load_power: float) -> float | None:
+    duty_cycle = history.duty_cycle
+    return None if duty_cycle is None else round(duty_cycle * 100, 1)
+
+
+def _energy(history: TelemetryHistory, load_power: float) -> float | None:
+    # Without the load power of the heating cable there is nothing to estimate.
+    if not load_power:
+        return None
+    return round(history.energy(load_power), 3)
+
+
+HISTORY_SENSORS: tuple[TerneoHistoryDescription, ...] = (
+    TerneoHistoryDescription(
+        key="duty_cycle",
+        name="Heating duty cycle",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_duty_cycle,
+    ),
+    TerneoHistoryDescription(
+        key="energy",
+        name="Estimated energy",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=_energy,
+    ),
+)
+
+METRIC_SENSORS: tuple[TerneoMetricDescription, ...] = (
+    TerneoMetricDescription(
+        key="cloud_requests",
+        name="Cloud requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m.request_count("cloud"),
+    ),
+    TerneoMetricDescription(
+        key="cloud_latency_p95",
+        name="Cloud latency p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: _milliseconds(m.transport_latency("cloud", 95)),
+    ),
+    TerneoMetricDescription(
+        key="local_requests",
+        name="Local requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m.request_count("local"),
+    ),
+    TerneoMetricDescription(
+        key="local_latency_p95",
+        name="Local latency p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: _milliseconds(m.transport_latency("local", 95)),
+    ),
+    TerneoMetricDescription(
+        key="poll_cycle_p95",
+        name="Poll cycle duration p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: _milliseconds(m.poll_cycles.percentile(95)),
+    ),
+    TerneoMetricDescription(
+        key="rate_limited",
+        name="Rate limited requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m.events["rate_limited"],
+    ),
+    TerneoMetricDescription(
+        key="backoff",
+        name="Backoff retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m.events["backoff"],
+    ),
+    TerneoMetricDescription(
+        key="discovery_rate",
+        name="Discovery packets per minute",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: m.discovery_packets.per_minute(),
+    ),
+    TerneoMetricDescription(
+        key="state_writes_skipped",
+        name="Skipped state writes",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m.events["state_write_skipped"],
+    ),
+)
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    coordinator: TerneoCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    @callback
+    def async_add_devices(devices: list[CloudDevice]) -> None:
+        async_add_entities(
+            TerneoHistorySensor(coordinator, entry, device, description)
+            for device in devices
+            for description in HISTORY_SENSORS
+        )
+
+    async_add_devices(coordinator.transport.cloud.cloud_devices)
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_DEVICES_ADDED.format(entry.entry_id), async_add_devices
+        )
+    )
+    async_add_entities(
+        TerneoMetricSensor(coordinator, entry, description)
+        for description in METRIC_SENSORS
+    )
+
+
+class TerneoSensor(CoordinatorEntity[TerneoCoordinator], SensorEntity):
+    """Sensor computed from coordinator state, written only when it changes."""
+
+    _last_value: float | int | None = None
+    _was_available: bool | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        value = self.native_value
+        available = self.available
+        if value == self._last_value and available == self._was_available:
+            return
+        self._last_value = value
+        self._was_available = available
+        self.async_write_ha_state()
+
+
+class TerneoHistorySensor(TerneoSensor):
+    """Heating statistic of one thermostat from its recent telemetry."""
+
+    entity_description: TerneoHistoryDescription
+
+    def __init__(
+        self,
+        coordinator: TerneoCoordinator,
+        entry,
+        cloud_device: CloudDevice,
+        description: TerneoHistoryDescription,
+    ) -> None:
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._entry = entry
+        self._serial_number = cloud_device.serial_number
+        self._device_name = cloud_device.name
+        self._attr_unique_id = f"{DOMAIN}_{self._serial_number}_{description.key}"
+        self._attr_name = f"{cloud_device.name} {description.name}"
+        self._attr_device_info = {"identifiers": {(DOMAIN, self._serial_number)}}
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        cloud_device = self.coordinator.transport.cloud.devices.get(
+            self._serial_number
+        )
+        if cloud_device is not None and cloud_device.name != self._device_name:
+            self._device_name = cloud_device.name
+            self._attr_name = f"{cloud_device.name} {self.entity_description.name}"
+            self._last_value = self.native_value
+            self._was_available = self.available
+            self.async_write_ha_state()
+            return
+        super()._handle_coordinator_update()
+
+    @property
+    def native_value(self) -> float | None:
+        history = self.coordinator.history.get(self._serial_number)
+        if history is None:
+            return None
+        # The thermostat's own setting wins; the option covers the ones whose
+        # settings can't be read because they are only reachable via the cloud.
+        load_power = self.coordinator.load_power.get(
+            self._serial_number
+        ) or self._entry.options.get(CONF_LOAD_POWER, DEFAULT_LOAD_POWER)
+        return self.entity_description.value_fn(history, load_power)
+
+
+class TerneoMetricSensor(TerneoSensor):
+    """Account level statistic, disabled by default."""
+
+    entity_description: TerneoMetricDescription
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: TerneoCoordinator,
+        entry,
+        description: TerneoMetricDescription,
+    ) -> None:
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}_{entry.entry_id}_{description.key}"
+        self._attr_name = f"Terneo {description.name}"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry.entry_id)},
+            "name": f"Terneo {entry.title}",
+            "manufacturer": "Terneo",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+    @property
+    def available(self) -> bool:
+        # Statistics stay meaningful while the cloud is down.
+        return True
+
+    @property
+    def native_value(self) -> float | int | None:
+        return self.entity_description.value_fn(self.coordinator.metrics)
@@ -0,0 +1,157 @@
+"""Services of the Terneo integration."""
+
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+
+from homeassistant.components.climate import ATTR_HVAC_MODE, HVACMode
+from homeassistant.const import ATTR_TEMPERATURE
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+from homeassistant.util import dt as dt_util
+
+from . import terneo_net
+from .const import DOMAIN
+from .coordinator import TerneoCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BULK_SET = "bulk_set"
+SERVICE_RECORD_TRACE = "record_trace"
+ATTR_DURATION = "duration"
+
+BULK_SET_SCHEMA = vol.All(
+    cv.make_entity_service_schema(
+        {
+            vol.Optional(ATTR_TEMPERATURE): vol.All(
+                vol.Coerce(int), vol.Range(min=5, max=45)
+            ),
+            vol.Optional(ATTR_HVAC_MODE): vol.In([HVACMode.HEAT, HVACMode.OFF]),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_TEMPERATURE, ATTR_HVAC_MODE),
+)
+
+RECORD_TRACE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=240)
+        ),
+    }
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    async def async_bulk_set(call: ServiceCall) -> ServiceResponse:
+        """Apply one change to many thermostats, grouped per account."""
+        temperature = call.data.get(ATTR_TEMPERATURE)
+        hvac_mode = call.data.get(ATTR_HVAC_MODE)
+        power_off = None if hvac_mode is None else hvac_mode == HVACMode.OFF
+
+        registry = er.async_get(hass)
+        targets: dict[str, dict[str, str]] = {}
+        results: dict[str, dict] = {}
+        selected = async_extract_referenced_entity_ids(hass, call)
+        for entity_id in selected.referenced | selected.indirectly_referenced:
+            entry = registry.async_get(entity_id)
+            if (
+                entry is None
+                or entry.platform != DOMAIN
+                or entry.domain != "climate"
+                or entry.config_entry_id not in hass.data.get(DOMAIN, {})
+            ):
+                # Other entities of a targeted area or device are skipped.
+                if entity_id in selected.referenced:
+                    results[entity_id] = {
+                        "success": False,
+                        "error": "not_a_terneo_device",
+                    }
+                continue
+            serial_number = entry.unique_id.removeprefix(f"{DOMAIN}_")
+            targets.setdefault(entry.config_entry_id, {})[serial_number] = entity_id
+
+        for entry_id, serials in targets.items():
+            coordinator: TerneoCoordinator = hass.data[DOMAIN][entry_id]
+            outcome = await coordinator.commands.submit_many(
+                serials, temperature, power_off
+            )
+            for serial_number, success in outcome.items():
+                results[serials[serial_number]] = {
+                    "serial_number": serial_number,
+                    "success": success,
+                }
+                if success:
+                    # Shown right away and checked with an early poll.
+                    coordinator.async_set_optimistic(
+                        serial_number, temperature, power_off
+                    )
+                    coordinator.async_poll_soon(serial_number)
+            coordinator.async_update_listeners()
+
+        failed = [e for e, r in results.items() if not r["success"]]
+        if failed:
+            _LOGGER.warning("Bulk change failed for %s", ", ".join(failed))
+        return {
+            "succeeded": len(results) - len(failed),
+            "failed": len(failed),
+            "results": results,
+        }
+
+    async def async_record_trace(call: ServiceCall) -> ServiceResponse:
+        """Record the cloud and LAN traffic of every account into trace files."""
+        stamp = dt_util.now().strftime("%Y%m%d-%H%M%S")
+        files = {}
+        for entry_id, coordinator in hass.data.get(DOMAIN, {}).items():
+            path = hass.config.path(f"terneo_trace_{entry_id}_{stamp}.jsonl.gz")
+            _async_start_trace(hass, coordinator, path, call.data[ATTR_DURATION])
+            files[entry_id] = path
+        return {"files": files}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_SET,
+        async_bulk_set,
+        schema=BULK_SET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RECORD_TRACE,
+        async_record_trace,
+        schema=RECORD_TRACE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _async_start_trace(
+    hass: HomeAssistant, coordinator: TerneoCoordinator, path: str, minutes: int
+) -> None:
+    """Attach a recorder to the services and save its trace when time is up."""
+    services = [coordinator.transport.cloud]
+    if coordinator.transport.local is not None:
+        services.append(coordinator.transport.local)
+    # Entries are set up, so the transports and the trace module are loaded.
+    recorder = terneo_net.TraceRecorder()
+    for service in services:
+        service.recorder = recorder
+
+    async def _async_stop(_now) -> None:
+        for service in services:
+            if service.recorder is recorder:
+                service.recorder = None
+        await hass.async_add_executor_job(recorder.save, path)
+        _LOGGER.info(
+            "Saved Terneo trace with %d events to %s", len(recorder.events), path
+        )
+
+    async_call_later(hass, minutes * 60, _async_stop)
+
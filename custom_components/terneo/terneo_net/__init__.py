@@ -0,0 +1,34 @@
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .cloud import CloudService
+    from .local import LocalService
+    from .trace import TraceRecorder
+    from .transport import TransportRouter
+
+# Modules pulling in httpx, sockets and the protocol tables. They are imported
+# on first use so that loading the integration only costs the light modules.
+_LAZY = {
+    "CloudService": "cloud",
+    "LocalService": "local",
+    "TraceRecorder": "trace",
+    "TransportRouter": "transport",
+}
+
+__all__ = ["load_transports", *_LAZY]
+
+
+def load_transports() -> None:
+    """Import the cloud and LAN transports; blocking, run it in an executor."""
+    for module in dict.fromkeys(_LAZY.values()):
+        importlib.import_module(f".{module}", __name__)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,89 @@
+import time
+from typing import Dict, Optional
+
+from .models import TerneoTelemetry
+
+DEFAULT_TTL = 10.0
+DEFAULT_MAX_STALE = 1800.0
+
+
+class CacheEntry:
+    __slots__ = ("telemetry", "fetched_at", "stale_since", "expired")
+
+    def __init__(self, telemetry: TerneoTelemetry, fetched_at: float):
+        self.telemetry = telemetry
+        self.fetched_at = fetched_at
+        # Wall clock time of the first failed refresh, None while fresh.
+        self.stale_since: Optional[float] = None
+        # Set when the device changed since, so the entry must be refreshed.
+        self.expired = False
+
+
+class TelemetryCache:
+    """Last known good telemetry per device.
+
+    Entries younger than `ttl` are served without any I/O. When a refresh
+    fails the entry is marked stale and keeps being served for up to
+    `max_stale` seconds after it was fetched, so a short outage doesn't make
+    devices unavailable.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_stale: float = DEFAULT_MAX_STALE):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries: Dict[str, CacheEntry] = {}
+
+    def put(
+        self,
+        serial_number: str,
+        telemetry: TerneoTelemetry,
+        now: Optional[float] = None,
+    ) -> None:
+        now = time.monotonic() if now is None else now
+        self._entries[serial_number] = CacheEntry(telemetry, now)
+
+    def get(self, serial_number: str) -> Optional[TerneoTelemetry]:
+        """Return the cached telemetry unless it is too old to be served."""
+        entry = self._entries.get(serial_number)
+        if entry is None or self.age(serial_number) > self.max_stale:
+            return None
+        return entry.telemetry
+
+    def is_fresh(self, serial_number: str, now: Optional[float] = None) -> bool:
+        entry = self._entries.get(serial_number)
+        if entry is None or entry.stale_since is not None or entry.expired:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - entry.fetched_at <= self.ttl
+
+    def age(self, serial_number: str) -> Optional[float]:
+        entry = self._entries.get(serial_number)
+        if entry is None:
+            return None
+        return time.monotonic() - entry.fetched_at
+
+    def mark_stale(self, serial_number: str) -> Optional[TerneoTelemetry]:
+        """Record a failed refresh; return the telemetry still worth serving."""
+        telemetry = self.get(serial_number)
+        if telemetry is not None:
+            entry = self._entries[serial_number]
+            if entry.stale_since is None:
+                entry.stale_since = time.time()
+        return telemetry
+
+    def expire(self, serial_number: str) -> None:
+        """Refresh the entry on the next read; it is still served if that fails."""
+        entry = self._entries.get(serial_number)
+        if entry is not None:
+            entry.expired = True
+
+    def is_expired(self, serial_number: str) -> bool:
+        entry = self._entries.get(serial_number)
+        return entry is not None and entry.expired
+
+    def stale_since(self, serial_number: str) -> Optional[float]:
+        entry = self._entries.get(serial_number)
+        return None if entry is None else entry.stale_since
+
+    def remove(self, serial_number: str) -> None:
+        self._entries.pop(serial_number, None)
@@ -1,100 +1,179 @@
-from dataclasses import dataclass
-from typing import List, Optional
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
 
 import httpx
 
-from .models import TerneoTelemetry
+from .exceptions import TerneoConnectionError
+from .metrics import Metrics, normalize_endpoint
+from .models import CloudDevice, TerneoTelemetry
+from .registry import DeviceRegistry
+from .resilience import CircuitBreaker, TokenBucket, backoff_delay, parse_retry_after
+from .session import CloudSession
+
+if TYPE_CHECKING:
+    from .trace import TraceRecorder
 
 API_BASE_URL = "https://my.terneo.ua/api"
 API_V2_BASE_URL = "https://my.terneo.ua/api-v2"
 
+MAX_CONCURRENT_REQUESTS = 8
+MAX_PAGES = 100
+REQUEST_TIMEOUT = 10.0
+MAX_RETRIES = 3
+RATE_LIMIT = 5.0  # requests per second per account
+RATE_LIMIT_BURST = 10
 
-@dataclass
-class CloudDevice:
-    id: int
-    serial_number: str
-    name: str
-    type: str
-    firmware_version: str
-    model: str
+_LOGGER = logging.getLogger(__name__)
 
 
 class CloudService:
-    HEADERS_BASE = {"Authorization": ""}
-
-    def __init__(self, email: str, password: str):
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        token: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        metrics: Optional[Metrics] = None,
+    ):
         self._email = email
         self._password = password
-        self._access_token = None
-        self.cloud_devices: List[CloudDevice] = []
-        self._http_client = None
+        self.session = CloudSession(self._login, token)
+        self.devices: DeviceRegistry[CloudDevice] = DeviceRegistry()
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+        self.rate_limiter = TokenBucket(RATE_LIMIT, RATE_LIMIT_BURST)
+        self.circuit_breaker = CircuitBreaker()
+        self.metrics = metrics or Metrics()
+        self.recorder: Optional["TraceRecorder"] = None
+        # Whether device list entries carry telemetry (None until a list was
+        # seen) and how many pages the list took last time.
+        self.list_has_telemetry: Optional[bool] = None
+        self._list_pages = 1
 
     async def _get_http_client(self):
         """Lazily initialize the HTTP client."""
         if not self._http_client:
             self._http_client = httpx.AsyncClient()
+            self._owns_http_client = True
         return self._http_client
 
     async def close(self):
-        """Close the HTTP client."""
-        if self._http_client:
+        """Close the HTTP client if it is owned by this service."""
+        if self._http_client and self._owns_http_client:
             await self._http_client.aclose()
-            self._http_client = None
+        self._http_client = None
+
+    @property
+    def cloud_devices(self) -> List[CloudDevice]:
+        return list(self.devices)
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.session.token
 
     async def initialize(self):
-        if await self.auth():
-            self.cloud_devices = await self._get_devices() or []
+        if await self.session.ensure_token():
+            self.devices.replace(await self.fetch_devices() or [])
 
     async def auth(self) -> bool:
+        """Log in with the account credentials, replacing any stored token."""
+        return await self.session.refresh(self.session.generation)
+
+    async def _login(self) -> Optional[str]:
         data = await self._send_request(
-            "POST", "/login/", json={"email": self._email, "password": self._password}
+            "POST",
+            "/login/",
+            authenticate=False,
+            json={"email": self._email, "password": self._password},
         )
         if not data:
-            return False
-        self._access_token = data.get("access_token", None)
-        self.HEADERS_BASE["Authorization"] = f"Token {self._access_token}"
-        return self._access_token is not None
+            return None
+        return data.get("access_token", None)
 
     def get_name(self, serial_number: str) -> Optional[str]:
-        cloud_device = next(
-            (d for d in self.cloud_devices if d.serial_number == serial_number), None
-        )
+        cloud_device = self.devices.get(serial_number)
         if not cloud_device:
             return None
 
         return cloud_device.name
 
     async def get_telemetry(self, serial_number: str) -> Optional[TerneoTelemetry]:
-        cloud_device = next(
-            (d for d in self.cloud_devices if d.serial_number == serial_number), None
-        )
+        cloud_device = self.devices.get(serial_number)
         if not cloud_device:
             return None
 
         data = await self._send_request("GET", f"/device/{cloud_device.id}/")
         if not data:
             return None
-        telemetry_data = data.get("data")
-        if not telemetry_data:
-            return None
+        return self._parse_telemetry(data.get("data"))
+
+    async def get_telemetry_batch(
+        self, serial_numbers: Iterable[str]
+    ) -> Dict[str, TerneoTelemetry]:
+        """Fetch telemetry for many devices using as few requests as possible.
+
+        When list entries carry telemetry and listing takes fewer requests
+        than there are devices to poll, the list is read and its entries are
+        used; the rest are fetched individually with at most
+        MAX_CONCURRENT_REQUESTS requests in flight. Until that is known only
+        the first page is read.
+        """
+        wanted = set(serial_numbers)
+        result: Dict[str, TerneoTelemetry] = {}
+
+        if self.list_has_telemetry is None:
+            devices = (await self._get_first_page() or {}).get("results")
+        elif self.list_has_telemetry and self._list_pages <= len(wanted):
+            devices = await self._list_devices()
+        else:
+            devices = None
+        for device in devices or []:
+            serial_number = device.get("sn")
+            if serial_number not in wanted:
+                continue
+            telemetry = self._parse_telemetry(device.get("data"))
+            if telemetry:
+                result[serial_number] = telemetry
+
+        missing = wanted.difference(result)
+        if not missing:
+            return result
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
-        telemetry = TerneoTelemetry(
-            power_off=self._safe_bool_conversion(telemetry_data["device_off"]),
+        async def fetch(serial_number: str) -> None:
+            async with semaphore:
+                telemetry = await self.get_telemetry(serial_number)
+            if telemetry:
+                result[serial_number] = telemetry
+
+        await asyncio.gather(*(fetch(sn) for sn in missing))
+        return result
+
+    def _parse_telemetry(
+        self, telemetry_data: Optional[dict]
+    ) -> Optional[TerneoTelemetry]:
+        if not telemetry_data or "temp_setpoint" not in telemetry_data:
+            return None
+        return TerneoTelemetry(
+            power_off=self._safe_bool_conversion(telemetry_data.get("device_off")),
             current_temperature=self._safe_float_conversion(
-                telemetry_data["temp_current"]
+                telemetry_data.get("temp_current")
             ),
-            heating=self._safe_bool_conversion(telemetry_data["setpoint_state"]),
+            heating=self._safe_bool_conversion(telemetry_data.get("setpoint_state")),
             target_temperature=int(telemetry_data["temp_setpoint"]),
         )
-        return telemetry
 
     @staticmethod
-    def _safe_float_conversion(value) -> float:
-        """Converts string to float safely."""
+    def _safe_float_conversion(value) -> Optional[float]:
+        """Converts string to float safely; None when there is no valid value."""
         try:
             return float(value)
         except (ValueError, TypeError):
-            return 0.0  # or some default value
+            return None
 
     @staticmethod
     def _safe_bool_conversion(value: Optional[bool]) -> bool:
@@ -102,9 +181,7 @@ class CloudService:
         return value is True
 
     async def set_temperature(self, serial_number: str, temperature: int) -> bool:
-        cloud_device = next(
-            (d for d in self.cloud_devices if d.serial_number == serial_number), None
-        )
+        cloud_device = self.devices.get(serial_number)
         if not cloud_device:
             return False
 
@@ -113,10 +190,11 @@ class CloudService:
         )
         return response_data and response_data.get("value", None) == temperature
 
-    async def _get_devices(self) -> Optional[List[CloudDevice]]:
-        devices_data = await self._send_request("GET", "/device/")
+    async def fetch_devices(self) -> Optional[List[CloudDevice]]:
+        """Return every device of the account, or None if any page failed."""
+        devices_data = await self._list_devices()
 
-        if not devices_data:
+        if devices_data is None:
             return None
         return [
             CloudDevice(
@@ -127,9 +205,80 @@ class CloudService:
                 firmware_version=device.get("version_name", "Unknown"),
                 model=self._extract_model_from_image(device.get("image", "")),
             )
-            for device in devices_data.get("results", [])
+            for device in devices_data
         ]
 
+    async def _list_devices(self) -> Optional[List[dict]]:
+        """Read all pages of the device list.
+
+        Once the first page tells the total count and the page size, the
+        other pages are requested concurrently. Next links after those, e.g.
+        of pages added while paging, and links that aren't numbered pages are
+        followed one by one.
+        """
+        first = await self._get_first_page()
+        if not first:
+            return None
+        results = list(first.get("results", []))
+        next_url = first.get("next")
+        if not next_url:
+            return results
+
+        count = first.get("count")
+        if (
+            isinstance(count, int)
+            and results
+            and httpx.URL(next_url).params.get("page") == "2"
+        ):
+            last_page = self._list_pages
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+            async def fetch(page: int) -> Optional[dict]:
+                async with semaphore:
+                    return await self._send_request(
+                        "GET", "/device/", params={"page": page}
+                    )
+
+            pages = await asyncio.gather(
+                *(fetch(page) for page in range(2, last_page + 1))
+            )
+            if not all(pages):
+                return None
+            if pages:
+                next_url = pages[-1].get("next")
+        else:
+            pages = []
+
+        seen = set()
+        while next_url and next_url not in seen and len(pages) < MAX_PAGES:
+            seen.add(next_url)
+            page = await self._send_request("GET", "", base_url=next_url)
+            if not page:
+                return None
+            pages.append(page)
+            next_url = page.get("next")
+
+        self._list_pages = 1 + len(pages)
+        for page in pages:
+            results.extend(page.get("results", []))
+        # A device added while paging can shift another one onto two pages.
+        return list({device.get("sn"): device for device in results}.values())
+
+    async def _get_first_page(self) -> Optional[dict]:
+        """Request the first page of the device list and note what it holds."""
+        first = await self._send_request("GET", "/device/")
+        results = (first or {}).get("results")
+        if results:
+            self.list_has_telemetry = any(
+                self._parse_telemetry(device.get("data")) for device in results
+            )
+            count = first.get("count")
+            if isinstance(count, int):
+                self._list_pages = min(-(-count // len(results)), MAX_PAGES)
+            else:
+                self._list_pages = 2 if first.get("next") else 1
+        return first
+
     @staticmethod
     def _extract_model_from_image(image: str) -> str:
         if not image:
@@ -149,9 +298,7 @@ class CloudService:
         )
 
     async def power_on_off(self, serial_number: str, is_off: bool) -> bool:
-        cloud_device = next(
-            (d for d in self.cloud_devices if d.serial_number == serial_number), None
-        )
+        cloud_device = self.devices.get(serial_number)
         if not cloud_device:
             return False
 
@@ -166,13 +313,102 @@ class CloudService:
             and response_data.get("result", {}).get("power_off", None) == is_off
         )
 
+    async def apply(
+        self,
+        serial_number: str,
+        temperature: Optional[int] = None,
+        power_off: Optional[bool] = None,
+    ) -> bool:
+        """Write the temperature and power state; the cloud needs one call each."""
+        success = True
+        if temperature is not None:
+            success = await self.set_temperature(serial_number, temperature)
+        if power_off is not None:
+            success = await self.power_on_off(serial_number, power_off) and success
+        return bool(success)
+
     async def _send_request(
-        self, method: str, endpoint: str, base_url=API_BASE_URL, **kwargs
+        self,
+        method: str,
+        endpoint: str,
+        base_url=API_BASE_URL,
+        authenticate: bool = True,
+        **kwargs,
     ) -> Optional[dict]:
         url = f"{base_url}{endpoint}"
-        client = await self._get_http_client()
-        headers = self.HEADERS_BASE.copy()
-        response = await client.request(method, url, headers=headers, **kwargs)
+        if authenticate and not await self.session.ensure_token():
+            return None
+        if not self.circuit_breaker.allow():
+            self.metrics.record_event("circuit_open")
+            _LOGGER.debug("Terneo cloud unavailable, skipping %s %s", method, url)
+            return None
+
+        generation = self.session.generation
+        response = await self._request_with_retry(method, url, authenticate, **kwargs)
+        if response.status_code == 401 and authenticate:
+            # The token expired: log in once for all failed requests and retry.
+            if not await self.session.refresh(generation):
+                return None
+            response = await self._request_with_retry(
+                method, url, authenticate, **kwargs
+            )
         if response.status_code != 200:
             return None
         return response.json()
+
+    async def _request_with_retry(
+        self, method: str, url: str, authenticate: bool, **kwargs
+    ) -> httpx.Response:
+        """Send a rate limited request, retrying errors, 429 and 5xx with backoff."""
+        client = await self._get_http_client()
+        endpoint = f"{method} {normalize_endpoint(urlsplit(url).path)}"
+        attempt = 0
+        while True:
+            if await self.rate_limiter.acquire():
+                self.metrics.record_event("rate_limited")
+            headers = self.session.headers if authenticate else {}
+            start = time.monotonic()
+            try:
+                response = await client.request(
+                    method, url, headers=headers, timeout=REQUEST_TIMEOUT, **kwargs
+                )
+            except httpx.TransportError as err:
+                self.metrics.record_request(
+                    "cloud", endpoint, type(err).__name__, time.monotonic() - start
+                )
+                if self.recorder:
+                    self.recorder.record_http("cloud", err, start)
+                if attempt == MAX_RETRIES:
+                    self.circuit_breaker.record_failure()
+                    raise TerneoConnectionError(
+                        str(err) or type(err).__name__
+                    ) from err
+                delay = backoff_delay(attempt)
+                reason = str(err) or type(err).__name__
+            else:
+                status = response.status_code
+                self.metrics.record_request(
+                    "cloud", endpoint, status, time.monotonic() - start
+                )
+                if self.recorder:
+                    self.recorder.record_http("cloud", response, start)
+                if status != 429 and status < 500:
+                    self.circuit_breaker.record_success()
+                    return response
+                if attempt == MAX_RETRIES:
+                    # 429 means the cloud is up but wants us to slow down.
+                    if status == 429:
+                        self.circuit_breaker.record_success()
+                    else:
+                        self.circuit_breaker.record_failure()
+                    return response
+                delay = backoff_delay(
+                    attempt, parse_retry_after(response.headers.get("Retry-After"))
+                )
+                reason = f"HTTP {status}"
+            self.metrics.record_event("backoff")
+            _LOGGER.debug(
+                "%s %s failed (%s), retrying in %.1fs", method, url, reason, delay
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+DEBOUNCE_DELAY = 0.5
+SETTLE_TIME = 10.0
+BULK_MAX_CONCURRENCY = 10
+
+_LOGGER = logging.getLogger(__name__)
+
+Writer = Callable[[str, Optional[int], Optional[bool]], Awaitable[bool]]
+
+
+@dataclass
+class PendingCommand:
+    temperature: Optional[int] = None
+    power_off: Optional[bool] = None
+    future: asyncio.Future = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class CommandQueue:
+    """Debounced, coalescing writes per device.
+
+    Commands submitted within DEBOUNCE_DELAY of each other are merged into a
+    single write carrying the latest temperature and power state. Writes to
+    one device never overlap, and for SETTLE_TIME seconds after a write the
+    device is reported as busy so polls don't overwrite the new state with
+    values read before the device applied it. Failed writes skip the settle
+    time so the next poll restores the real state.
+    """
+
+    def __init__(
+        self,
+        writer: Writer,
+        delay: float = DEBOUNCE_DELAY,
+        settle_time: float = SETTLE_TIME,
+    ):
+        self._writer = writer
+        self._delay = delay
+        self._settle_time = settle_time
+        self._pending: Dict[str, PendingCommand] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._last_write: Dict[str, float] = {}
+        self._tasks: set = set()
+
+    def submit(
+        self,
+        serial_number: str,
+        temperature: Optional[int] = None,
+        power_off: Optional[bool] = None,
+    ) -> "asyncio.Future[bool]":
+        """Queue a change; the future resolves when the merged write is done."""
+        command = self._pending.get(serial_number)
+        if command is None:
+            command = self._pending[serial_number] = PendingCommand()
+        if temperature is not None:
+            command.temperature = temperature
+        if power_off is not None:
+            command.power_off = power_off
+
+        if command.timer:
+            command.timer.cancel()
+        command.timer = asyncio.get_running_loop().call_later(
+            self._delay, self._start_flush, serial_number
+        )
+        return command.future
+
+    async def submit_many(
+        self,
+        serial_numbers: Iterable[str],
+        temperature: Optional[int] = None,
+        power_off: Optional[bool] = None,
+        max_concurrency: int = BULK_MAX_CONCURRENCY,
+    ) -> Dict[str, bool]:
+        """Queue the same change for many devices, a few writes at a time.
+
+        Each change is merged with pending ones for its device like any other
+        command; returns the outcome per serial number.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        result: Dict[str, bool] = {}
+
+        async def submit(serial_number: str) -> None:
+            async with semaphore:
+                result[serial_number] = await self.submit(
+                    serial_number, temperature, power_off
+                )
+
+        await asyncio.gather(*(submit(sn) for sn in serial_numbers))
+        return result
+
+    def is_busy(self, serial_number: str) -> bool:
+        """Return True while polled state may not reflect the latest command."""
+        if serial_number in self._pending or self._in_flight.get(serial_number):
+            return True
+        last_write = self._last_write.get(serial_number)
+        return (
+            last_write is not None
+            and time.monotonic() - last_write < self._settle_time
+        )
+
+    async def flush(self) -> None:
+        """Send all pending commands right away."""
+        for serial_number in list(self._pending):
+            self._start_flush(serial_number)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _start_flush(self, serial_number: str) -> None:
+        command = self._pending.pop(serial_number, None)
+        if command is None:
+            return
+        if command.timer:
+            command.timer.cancel()
+        self._in_flight[serial_number] = self._in_flight.get(serial_number, 0) + 1
+        task = asyncio.ensure_future(self._write(serial_number, command))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, serial_number: str, command: PendingCommand) -> None:
+        lock = self._locks.setdefault(serial_number, asyncio.Lock())
+        try:
+            async with lock:
+                try:
+                    success = await self._writer(
+                        serial_number, command.temperature, command.power_off
+                    )
+                except Exception:  # noqa: BLE001
+                    _LOGGER.exception("Error writing to device %s", serial_number)
+                    success = False
+                if success:
+                    self._last_write[serial_number] = time.monotonic()
+        finally:
+            self._in_flight[serial_number] -= 1
+        if not command.future.done():
+            command.future.set_result(bool(success))
@@ -0,0 +1,2 @@
+class TerneoConnectionError(Exception):
+    """The Terneo cloud could not be reached, even after retries."""
@@ -0,0 +1,114 @@
+import math
+import time
+from array import array
+from typing import Optional
+
+from .models import TerneoTelemetry
+
+HISTORY_SIZE = 512
+HISTORY_WINDOW = 24 * 3600.0
+# Longer gaps between samples (device offline, HA stopped) are not counted.
+MAX_GAP = 1800.0
+
+
+def _gap(start: float, end: float) -> float:
+    return min(end - start, MAX_GAP)
+
+
+class TelemetryHistory:
+    """Recent samples of one device in fixed-size arrays used as a ring buffer.
+
+    The heating relay is assumed to keep its state until the next sample.
+    Heating time is kept as a running sum over the samples in the ring, so
+    the duty cycle costs O(1) per sample however long the window is.
+    Samples older than `window` seconds are dropped as well.
+    """
+
+    __slots__ = (
+        "capacity",
+        "window",
+        "_times",
+        "_temperatures",
+        "_heating",
+        "_start",
+        "_count",
+        "_span",
+        "_heating_time",
+        "total_heating_time",
+    )
+
+    def __init__(self, capacity: int = HISTORY_SIZE, window: float = HISTORY_WINDOW):
+        self.capacity = capacity
+        self.window = window
+        self._times = array("d", bytes(8 * capacity))
+        self._temperatures = array("f", bytes(4 * capacity))
+        self._heating = array("b", bytes(capacity))
+        self._start = 0
+        self._count = 0
+        # Covered and heating seconds between the samples in the ring.
+        self._span = 0.0
+        self._heating_time = 0.0
+        # Heating seconds since the history was created, never evicted.
+        self.total_heating_time = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, telemetry: TerneoTelemetry, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        heating = bool(telemetry.heating) and not telemetry.power_off
+        if self._count:
+            last = (self._start + self._count - 1) % self.capacity
+            if now <= self._times[last]:
+                return
+            gap = _gap(self._times[last], now)
+            self._span += gap
+            if self._heating[last]:
+                self._heating_time += gap
+                self.total_heating_time += gap
+        if self._count == self.capacity:
+            self._evict()
+        index = (self._start + self._count) % self.capacity
+        self._times[index] = now
+        temperature = telemetry.current_temperature
+        self._temperatures[index] = math.nan if temperature is None else temperature
+        self._heating[index] = heating
+        self._count += 1
+        while self._count > 1 and now - self._times[self._start] > self.window:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop the oldest sample and the interval that followed it."""
+        oldest = self._start
+        self._start = (self._start + 1) % self.capacity
+        self._count -= 1
+        if self._count:
+            gap = _gap(self._times[oldest], self._times[self._start])
+            self._span -= gap
+            if self._heating[oldest]:
+                self._heating_time -= gap
+
+    @property
+    def duty_cycle(self) -> Optional[float]:
+        """Share of time the relay was on over the samples kept, 0..1."""
+        if self._span <= 0:
+            return None
+        return min(max(self._heating_time / self._span, 0.0), 1.0)
+
+    @property
+    def span(self) -> float:
+        """Seconds covered by the samples kept."""
+        return self._span
+
+    def energy(self, load_power: float) -> float:
+        """Estimated kWh used since the history was created."""
+        return self.total_heating_time * load_power / 3_600_000
+
+    def temperatures(self) -> list:
+        """Recorded (time, temperature) pairs, oldest first."""
+        result = []
+        for offset in range(self._count):
+            index = (self._start + offset) % self.capacity
+            value = self._temperatures[index]
+            result.append((self._times[index], None if math.isnan(value) else value))
+        return result
@@ -1,59 +1,226 @@
 import asyncio
 import json
+import logging
 import socket
-import threading
-from typing import Callable, List, Optional
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
 
 import httpx
-from terneo_net.models import TerneoDevice, TerneoTelemetry
+
+from .metrics import Metrics
+from .models import TerneoDevice, TerneoTelemetry
+from .networks import DEFAULT_SCAN_CONCURRENCY
+from .protocol import (
+    TELEMETRY_KEYS,
+    VOLATILE_PARAMETERS,
+    LocalTelemetry,
+    encode_parameters,
+    parse_parameters,
+    parse_telemetry,
+)
+from .registry import DeviceRegistry
+
+if TYPE_CHECKING:
+    from .trace import TraceRecorder
 
 API_URI = "http://{}/api.cgi"
 UDP_PORT = 23500
 
+DEFAULT_MAX_CONCURRENT_REQUESTS = 16
+DEFAULT_REQUEST_TIMEOUT = 5.0
+DEFAULT_DISCOVERY_TIMEOUT = 10.0
+DEFAULT_STALE_AFTER = 120.0
+DEFAULT_SCAN_TIMEOUT = 1.0
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, service: "LocalService"):
+        self._service = service
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self._service._handle_datagram(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        _LOGGER.debug("Discovery socket error: %s", exc)
+
 
 class LocalService:
-    def __init__(self):
-        self._online_devices: List[TerneoDevice] = []
-        self._semaphore = asyncio.Semaphore(1)
-        self._discovery_thread = None
-        self._udp_socket = None
-        self._is_discovering = False
+    def __init__(
+        self,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        http_client: Optional[httpx.AsyncClient] = None,
+        metrics: Optional[Metrics] = None,
+        stale_after: float = DEFAULT_STALE_AFTER,
+    ):
+        self._online_devices: DeviceRegistry[TerneoDevice] = DeviceRegistry()
+        # Requests to one device are serialized, the total is capped globally.
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._device_locks: Dict[str, asyncio.Lock] = {}
+        self._max_concurrent_requests = max_concurrent_requests
+        self._timeout = httpx.Timeout(request_timeout)
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+        self.metrics = metrics or Metrics()
+        self._discovery_transport: Optional[asyncio.DatagramTransport] = None
+        self._devices_changed = asyncio.Event()
         self.on_device_discovered: List[Callable[[TerneoDevice], None]] = []
+        # Latest telemetry per device with the monotonic time it was received.
+        self._telemetry: Dict[str, Tuple[float, TerneoTelemetry]] = {}
+        self.stale_after = stale_after
+        self.on_telemetry: List[Callable[[str, TerneoTelemetry], None]] = []
+        # Full decoded telemetry and the cached settings (cmd:1) per device.
+        self._details: Dict[str, LocalTelemetry] = {}
+        self._parameters: Dict[str, Dict[str, Any]] = {}
+        self.recorder: Optional["TraceRecorder"] = None
+
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """Lazily initialize the pooled HTTP client."""
+        if not self._http_client:
+            self._http_client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=httpx.Limits(
+                    max_connections=self._max_concurrent_requests,
+                    max_keepalive_connections=self._max_concurrent_requests,
+                ),
+            )
+            self._owns_http_client = True
+        return self._http_client
 
-    async def initialize(self):
-        self._start_discovery()
-        await asyncio.sleep(120)  # 2 minutes
-        self._stop_discovery()
+    async def close(self):
+        """Stop discovery and close the HTTP client if it is owned by us."""
+        self.stop_discovery()
+        if self._http_client and self._owns_http_client:
+            await self._http_client.aclose()
+        self._http_client = None
+
+    async def initialize(
+        self, expected_devices: int = 0, timeout: float = DEFAULT_DISCOVERY_TIMEOUT
+    ) -> List[TerneoDevice]:
+        """Start background discovery.
+
+        Discovery keeps running until close(); when expected_devices is set
+        this waits until that many devices were seen or the timeout expires.
+        """
+        await self.start_discovery()
+        if expected_devices:
+            return await self.wait_for_devices(expected_devices, timeout)
+        return list(self._online_devices)
+
+    @property
+    def is_discovering(self) -> bool:
+        return self._discovery_transport is not None
+
+    @property
+    def devices(self) -> DeviceRegistry[TerneoDevice]:
+        return self._online_devices
+
+    def get_device(self, serial_number: str) -> Optional[TerneoDevice]:
+        return self._online_devices.get(serial_number)
+
+    async def wait_for_devices(
+        self, count: int = 1, timeout: float = DEFAULT_DISCOVERY_TIMEOUT
+    ) -> List[TerneoDevice]:
+        """Wait until at least count devices were discovered or timeout expires."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self._online_devices) < count and self.is_discovering:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self._devices_changed.clear()
+            try:
+                await asyncio.wait_for(self._devices_changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return list(self._online_devices)
 
     async def get_telemetry(self, serial_number: str) -> Optional[TerneoTelemetry]:
-        device = next(
-            (d for d in self._online_devices if d.serial_number == serial_number), None
-        )
+        device = self._online_devices.get(serial_number)
         if not device:
             return None
 
-        async with self._semaphore, httpx.AsyncClient() as client:
-            response = await client.post(API_URI.format(device.ip), json={"cmd": 4})
-            if response.status_code != 200:
-                return None
-            data = response.json()
-            telemetry = self._parse_telemetry_data(data)
-            return telemetry
+        data = await self._send_request(device, {"cmd": 4})
+        if not data:
+            return None
+        # Only broadcasts feed the push cache; a polled reply is as old as
+        # the router's own cache entry for it.
+        return self._store_details(serial_number, data)
 
-    async def set_temperature(self, serial_number: str, temperature: int) -> bool:
-        device = next(
-            (d for d in self._online_devices if d.serial_number == serial_number), None
-        )
+    def get_details(self, serial_number: str) -> Optional[LocalTelemetry]:
+        """Return everything the last poll or broadcast reported."""
+        return self._details.get(serial_number)
+
+    async def get_parameters(
+        self, serial_number: str, refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Return the device settings, read once with cmd:1 and then cached.
+
+        Setpoint and power state are left out, they come with the telemetry.
+        """
+        cached = self._parameters.get(serial_number)
+        if cached is not None and not refresh:
+            return dict(cached)
+        device = self._online_devices.get(serial_number)
+        if not device:
+            return None
+        data = await self._send_request(device, {"cmd": 1})
+        if not data:
+            return None
+        parameters = {
+            name: value
+            for name, value in parse_parameters(data).items()
+            if name not in VOLATILE_PARAMETERS
+        }
+        self._parameters[serial_number] = parameters
+        return dict(parameters)
+
+    async def set_parameters(self, serial_number: str, **values: Any) -> bool:
+        """Write settings by name in one request and drop the cached copy."""
+        device = self._online_devices.get(serial_number)
         if not device:
             return False
+        parameters = encode_parameters(values.items())
+        if not parameters:
+            return True
+        data = await self._send_request(
+            device, {"sn": device.serial_number, "par": parameters}
+        )
+        # The device may clamp values, so read them back next time.
+        self._parameters.pop(serial_number, None)
+        return bool(data and data.get("success", False))
 
-        async with self._semaphore, httpx.AsyncClient() as client:
-            response = await client.post(
-                API_URI.format(device.ip),
-                json={"sn": device.serial_number, "par": [[5, 1, str(temperature)]]},
-            )
-            data = response.json()
-            return data.get("success", False)
+    def get_cached_telemetry(
+        self, serial_number: str, max_age: Optional[float] = None
+    ) -> Optional[TerneoTelemetry]:
+        """Return telemetry received within max_age seconds (stale_after by default)."""
+        cached = self._telemetry.get(serial_number)
+        if cached is None:
+            return None
+        received, telemetry = cached
+        max_age = self.stale_after if max_age is None else max_age
+        if time.monotonic() - received > max_age:
+            return None
+        return telemetry
+
+    def invalidate_telemetry(self, serial_number: str) -> None:
+        """Forget broadcast telemetry, e.g. once it is outdated by a write."""
+        self._telemetry.pop(serial_number, None)
+
+    async def set_temperature(self, serial_number: str, temperature: int) -> bool:
+        return await self.apply(serial_number, temperature=temperature)
 
     async def power_on(self, serial_number: str) -> bool:
         return await self._power_on_off(serial_number, False)
@@ -62,91 +229,228 @@ class LocalService:
         return await self._power_on_off(serial_number, True)
 
     async def _power_on_off(self, serial_number: str, is_off: bool) -> bool:
-        device = next(
-            (d for d in self._online_devices if d.serial_number == serial_number), None
-        )
+        return await self.apply(serial_number, power_off=is_off)
+
+    async def apply(
+        self,
+        serial_number: str,
+        temperature: Optional[int] = None,
+        power_off: Optional[bool] = None,
+    ) -> bool:
+        """Write the temperature and power state in a single request."""
+        device = self._online_devices.get(serial_number)
         if not device:
             return False
 
-        async with self._semaphore, httpx.AsyncClient() as client:
+        parameters = encode_parameters(
+            (("manual_temperature", temperature), ("power_off", power_off))
+        )
+        if not parameters:
+            return True
+
+        data = await self._send_request(
+            device, {"sn": device.serial_number, "par": parameters}
+        )
+        return bool(data and data.get("success", False))
+
+    async def _send_request(
+        self, device: TerneoDevice, payload: dict
+    ) -> Optional[dict]:
+        lock = self._device_locks.setdefault(device.serial_number, asyncio.Lock())
+        client = await self._get_http_client()
+        endpoint = f"cmd:{payload['cmd']}" if "cmd" in payload else "par"
+        async with lock, self._semaphore:
+            start = time.monotonic()
+            try:
+                response = await client.post(
+                    API_URI.format(device.ip), json=payload, timeout=self._timeout
+                )
+            except httpx.HTTPError as err:
+                self.metrics.record_request(
+                    "local", endpoint, type(err).__name__, time.monotonic() - start
+                )
+                if self.recorder:
+                    self.recorder.record_http("local", err, start)
+                return None
+        self.metrics.record_request(
+            "local", endpoint, response.status_code, time.monotonic() - start
+        )
+        if self.recorder:
+            self.recorder.record_http("local", response, start)
+        if response.status_code != 200:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    async def scan(
+        self,
+        addresses: Iterable[str],
+        serial_numbers: Optional[Collection[str]] = None,
+        concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+        timeout: float = DEFAULT_SCAN_TIMEOUT,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ) -> List[TerneoDevice]:
+        """Probe addresses with cmd:4 for networks where broadcasts don't arrive.
+
+        Thermostats that answer are registered like discovered ones, limited to
+        serial_numbers when given. Probes bypass the per-device locks and need
+        a client sized for the concurrency, so that a /22 is done within a few
+        timeouts; one is created when http_client isn't given.
+        """
+        owns_client = http_client is None
+        if owns_client:
+            http_client = self.create_scan_client(concurrency)
+        targets = iter(addresses)
+        found: List[TerneoDevice] = []
+
+        async def worker() -> None:
+            # Workers share one iterator instead of one task per address.
+            for ip in targets:
+                data = await self._probe(http_client, ip, timeout)
+                if data is None:
+                    continue
+                serial_number = data.get("sn")
+                if not serial_number or (
+                    serial_numbers is not None and serial_number not in serial_numbers
+                ):
+                    continue
+                device = TerneoDevice(ip=ip, serial_number=serial_number)
+                found.append(device)
+                self._store_details(serial_number, data)
+                self._register(device)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            if owns_client:
+                await http_client.aclose()
+        self.metrics.record_event("scan")
+        return found
+
+    @staticmethod
+    def create_scan_client(
+        concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+    ) -> httpx.AsyncClient:
+        """Client for scan(); blocking, create it in an executor from Home Assistant."""
+        return httpx.AsyncClient(
+            trust_env=False,
+            limits=httpx.Limits(
+                max_connections=concurrency, max_keepalive_connections=0
+            ),
+        )
+
+    async def _probe(
+        self, client: httpx.AsyncClient, ip: str, timeout: float
+    ) -> Optional[dict]:
+        self.metrics.record_event("scan_probe")
+        start = time.monotonic()
+        try:
             response = await client.post(
-                API_URI.format(device.ip),
-                json={
-                    "sn": device.serial_number,
-                    "par": [[125, 7, "1" if is_off else "0"]],
-                },
+                API_URI.format(ip), json={"cmd": 4}, timeout=timeout
             )
-            data = response.json()
-            return data.get("success", False)
+        except httpx.HTTPError as err:
+            if self.recorder:
+                self.recorder.record_http("local", err, start)
+            return None
+        if self.recorder:
+            self.recorder.record_http("local", response, start)
+        try:
+            data = response.json() if response.status_code == 200 else None
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
 
-    def _start_discovery(self):
-        self._stop_discovery()
-        self._is_discovering = True
+    async def start_discovery(self):
+        self.stop_discovery()
         self._online_devices.clear()
-        self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._udp_socket.bind(("", UDP_PORT))
-        self._discovery_thread = threading.Thread(target=self._udp_listener)
-        self._discovery_thread.start()
-
-    def _stop_discovery(self):
-        self._is_discovering = False
-        if self._udp_socket:
-            self._udp_socket.close()
-            self._udp_socket = None
-        self._discovery_thread = None
-
-    def _udp_listener(self):
-        while self._is_discovering:
+        loop = asyncio.get_running_loop()
+        self._discovery_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DiscoveryProtocol(self),
+            local_addr=("0.0.0.0", UDP_PORT),
+            reuse_port=hasattr(socket, "SO_REUSEPORT"),
+        )
+
+    def stop_discovery(self):
+        if self._discovery_transport:
+            self._discovery_transport.close()
+            self._discovery_transport = None
+        # Wake up waiters so they return what was found so far.
+        self._devices_changed.set()
+
+    def _handle_datagram(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if self.recorder:
+            self.recorder.record_datagram(data, addr)
+        message = self._decode_datagram(data)
+        self.metrics.record_discovery_packet(message is not None)
+        if message is None:
+            _LOGGER.debug("Ignoring malformed discovery packet from %s", addr[0])
+            return
+
+        device = self._parse_discovery_data(message)
+        device.ip = addr[0]
+        # Broadcasts carrying cmd:4 reply keys double as telemetry. They may
+        # carry only some of them, so they update the last known details and
+        # are pushed once the device's state is fully known.
+        if not TELEMETRY_KEYS.isdisjoint(message):
+            details = parse_telemetry(
+                message, self._details.get(device.serial_number)
+            )
+            self._details[device.serial_number] = details
+            if details.is_complete:
+                self._push_telemetry(device.serial_number, details.to_telemetry())
+
+        self._register(device)
+
+    def _register(self, device: TerneoDevice) -> None:
+        known = self._online_devices.get(device.serial_number)
+        if known is not None and known == device:
+            return
+        self._online_devices.add(device)
+        self._devices_changed.set()
+        for callback in self.on_device_discovered:
             try:
-                data, addr = self._udp_socket.recvfrom(1024)  # 1024 is buffer size
-                # return_data = data.decode('ASCII')
-                ip = addr[0]
-                device = self._parse_discovery_data(data.decode())
-                if device is None:
-                    return
-
-                device.ip = ip
-                if device not in self._online_devices:
-                    self._online_devices.append(device)
-                    for callback in self.on_device_discovered:
-                        callback(device)
-            except:
-                if not self._is_discovering:
-                    return
+                callback(device)
+            except Exception:  # noqa: BLE001
+                _LOGGER.exception("Error in device discovered callback")
+
+    def _push_telemetry(self, serial_number: str, telemetry: TerneoTelemetry) -> None:
+        previous = self._telemetry.get(serial_number)
+        self._telemetry[serial_number] = (time.monotonic(), telemetry)
+        if previous is not None and previous[1] == telemetry:
+            return
+        for callback in self.on_telemetry:
+            try:
+                callback(serial_number, telemetry)
+            except Exception:  # noqa: BLE001
+                _LOGGER.exception("Error in telemetry callback")
+
+    def _store_details(self, serial_number: str, data: dict) -> TerneoTelemetry:
+        details = parse_telemetry(data)
+        self._details[serial_number] = details
+        return details.to_telemetry()
 
     @staticmethod
-    def _parse_discovery_data(json_str) -> Optional[TerneoDevice]:
+    def _decode_datagram(payload: bytes) -> Optional[dict]:
         try:
-            # hardware = data.get("hw"),
-            # cloud = data.get("cloud"),
-            # connection = data.get("connection"),
-            # wifi_signal = data.get("wifi"),
-            # display = data.get("display")
-
-            data = json.loads(json_str)
-            return TerneoDevice(ip=data.get("ip"), serial_number=data.get("sn"))
-        except json.JSONDecodeError:
+            data = json.loads(payload)
+        except (UnicodeDecodeError, json.JSONDecodeError):
             return None
+        if not isinstance(data, dict) or not data.get("sn"):
+            return None
+        return data
 
     @staticmethod
-    def _parse_telemetry_data(data: dict) -> TerneoTelemetry:
-        # Parsing current_temperature
-        current_temp_value = data.get("t.1")
-        if current_temp_value:
-            current_temperature = int(current_temp_value) / 16.0
-        else:
-            current_temperature = None
-
-        # Parsing target_temperature
-        target_temp_value = data.get("t.5")
-        if target_temp_value:
-            target_temperature = int(target_temp_value) // 16
-        else:
-            target_temperature = None
-
-        return TerneoTelemetry(
-            current_temperature=current_temperature,
-            target_temperature=target_temperature,
-            heating=data.get("f.0") == "1",
-            power_off=data.get("f.16") == "1",
+    def _parse_discovery_data(data: dict) -> TerneoDevice:
+        # Other fields seen in broadcasts: "cloud", "connection", "display".
+        try:
+            wifi_signal = int(data["wifi"])
+        except (KeyError, TypeError, ValueError):
+            wifi_signal = None
+        return TerneoDevice(
+            ip=data.get("ip"),
+            serial_number=data["sn"],
+            hardware=data.get("hw"),
+            wifi_signal=wifi_signal,
         )
@@ -0,0 +1,136 @@
+import re
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Tuple
+
+WINDOW_SIZE = 1000
+RATE_WINDOW = 60.0
+
+_ID_RE = re.compile(r"/\d+/")
+
+
+def normalize_endpoint(path: str) -> str:
+    """Collapse device ids so all devices share one endpoint name."""
+    return _ID_RE.sub("/{id}/", path)
+
+
+def _percentile(ordered: list, pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+class LatencyWindow:
+    """The last WINDOW_SIZE durations, summarized as count and percentiles."""
+
+    __slots__ = ("count", "_samples")
+
+    def __init__(self, size: int = WINDOW_SIZE):
+        self.count = 0
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        return _percentile(sorted(self._samples), pct)
+
+    def as_dict(self) -> dict:
+        result = {"count": self.count}
+        for pct in (50, 95, 99):
+            value = self.percentile(pct)
+            result[f"p{pct}_ms"] = None if value is None else round(value * 1000, 1)
+        return result
+
+
+class RateCounter:
+    """Total number of events plus the rate over the last RATE_WINDOW seconds."""
+
+    __slots__ = ("total", "_times")
+
+    def __init__(self):
+        self.total = 0
+        self._times: Deque[float] = deque()
+
+    def add(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.total += 1
+        self._times.append(now)
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        while self._times and now - self._times[0] > RATE_WINDOW:
+            self._times.popleft()
+
+    def per_minute(self, now: Optional[float] = None) -> float:
+        self._expire(time.monotonic() if now is None else now)
+        return len(self._times) * 60.0 / RATE_WINDOW
+
+
+class Metrics:
+    """Request, poll and discovery statistics shared by the services of an account."""
+
+    def __init__(self):
+        self._latency: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._statuses: Dict[Tuple[str, str], Counter] = {}
+        self.events: Counter = Counter()
+        self.poll_cycles = LatencyWindow()
+        self.discovery_packets = RateCounter()
+        self.invalid_discovery_packets = 0
+
+    def record_request(
+        self, transport: str, endpoint: str, status: object, seconds: float
+    ) -> None:
+        """Record one request; status is the HTTP code or an error name."""
+        key = (transport, endpoint)
+        window = self._latency.get(key)
+        if window is None:
+            window = self._latency[key] = LatencyWindow()
+            self._statuses[key] = Counter()
+        window.add(seconds)
+        self._statuses[key][str(status)] += 1
+
+    def record_event(self, name: str) -> None:
+        self.events[name] += 1
+
+    def record_poll_cycle(self, seconds: float) -> None:
+        self.poll_cycles.add(seconds)
+
+    def record_discovery_packet(self, valid: bool) -> None:
+        self.discovery_packets.add()
+        if not valid:
+            self.invalid_discovery_packets += 1
+
+    def transport_latency(self, transport: str, pct: float) -> Optional[float]:
+        """Percentile over all endpoints of a transport, in seconds."""
+        samples = sorted(
+            sample
+            for (name, _), window in self._latency.items()
+            if name == transport
+            for sample in window._samples
+        )
+        return _percentile(samples, pct)
+
+    def request_count(self, transport: str) -> int:
+        return sum(
+            w.count for (name, _), w in self._latency.items() if name == transport
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": {
+                f"{transport} {endpoint}": {
+                    **window.as_dict(),
+                    "status": dict(self._statuses[(transport, endpoint)]),
+                }
+                for (transport, endpoint), window in sorted(self._latency.items())
+            },
+            "poll_cycles": self.poll_cycles.as_dict(),
+            "events": dict(self.events),
+            "discovery": {
+                "packets": self.discovery_packets.total,
+                "invalid": self.invalid_discovery_packets,
+                "per_minute": self.discovery_packets.per_minute(),
+            },
+        }
@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TerneoTelemetry:
+    """Immutable snapshot; equal snapshots mean nothing changed."""
+
     current_temperature: Optional[float]
     target_temperature: Optional[int]
     heating: Optional[bool]
@@ -14,10 +16,22 @@ class TerneoTelemetry:
                f"Power off: {self.power_off}"
 
 
+@dataclass
+class CloudDevice:
+    id: int
+    serial_number: str
+    name: str
+    type: str
+    firmware_version: str
+    model: str
+
+
 @dataclass
 class TerneoDevice:
     ip: str
     serial_number: str
+    hardware: Optional[str] = None
+    wifi_signal: Optional[int] = None
 
     def __eq__(self, other):
         if isinstance(other, TerneoDevice):
@@ -0,0 +1,27 @@
+import ipaddress
+from typing import Dict, Iterable, List
+
+MAX_SCAN_HOSTS = 4096
+DEFAULT_SCAN_CONCURRENCY = 256
+
+
+def expand_networks(networks: Iterable[str]) -> List[str]:
+    """Host addresses of CIDR ranges or single addresses, without duplicates.
+
+    Raises ValueError for invalid ranges or more than MAX_SCAN_HOSTS hosts.
+    """
+    hosts: Dict[str, None] = {}
+    for network in networks:
+        network = network.strip()
+        if not network:
+            continue
+        parsed = ipaddress.ip_network(network, strict=False)
+        if parsed.version != 4:
+            raise ValueError(f"{network} is not an IPv4 network")
+        if parsed.num_addresses > MAX_SCAN_HOSTS:
+            raise ValueError(f"{network} has more than {MAX_SCAN_HOSTS} addresses")
+        for host in parsed.hosts():
+            hosts[str(host)] = None
+        if len(hosts) > MAX_SCAN_HOSTS:
+            raise ValueError(f"More than {MAX_SCAN_HOSTS} addresses to scan")
+    return list(hosts)
@@ -0,0 +1,172 @@
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .models import TerneoTelemetry
+
+# Value types of the "par" arrays used by cmd:1 and by writes.
+TYPE_INT8 = 1
+TYPE_UINT8 = 2
+TYPE_INT16 = 3
+TYPE_UINT16 = 4
+TYPE_INT32 = 5
+TYPE_UINT32 = 6
+TYPE_BOOL = 7
+
+MODE_SCHEDULE = 0
+MODE_MANUAL = 1
+
+CONTROL_FLOOR = 0
+CONTROL_AIR = 1
+CONTROL_AIR_FLOOR_LIMIT = 2
+
+
+def _temperature(raw: str) -> float:
+    return int(raw) / 16.0
+
+
+def _setpoint(raw: str) -> int:
+    return int(raw) // 16
+
+
+def _flag(raw: str) -> bool:
+    return raw == "1"
+
+
+@dataclass(frozen=True, slots=True)
+class LocalTelemetry:
+    """Everything a cmd:4 reply or a status broadcast reports."""
+
+    temperature: Optional[float] = None
+    internal_temperature: Optional[float] = None
+    air_temperature: Optional[float] = None
+    setpoint: Optional[int] = None
+    heating: Optional[bool] = None
+    power_off: Optional[bool] = None
+    mode: Optional[int] = None
+    control_type: Optional[int] = None
+    wifi_signal: Optional[int] = None
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether everything to_telemetry() reports is known."""
+        return None not in (
+            self.temperature,
+            self.setpoint,
+            self.heating,
+            self.power_off,
+        )
+
+    def to_telemetry(self) -> TerneoTelemetry:
+        return TerneoTelemetry(
+            current_temperature=self.temperature,
+            target_temperature=self.setpoint,
+            heating=bool(self.heating),
+            power_off=bool(self.power_off),
+        )
+
+
+# Reply key and converter for each LocalTelemetry field, in field order.
+TELEMETRY_FIELDS: Tuple[Tuple[str, Callable[[str], Any]], ...] = (
+    ("t.1", _temperature),
+    ("t.0", _temperature),
+    ("t.2", _temperature),
+    ("t.5", _setpoint),
+    ("f.0", _flag),
+    ("f.16", _flag),
+    ("m.0", int),
+    ("m.1", int),
+    ("o.0", int),
+)
+TELEMETRY_KEYS = frozenset(key for key, _ in TELEMETRY_FIELDS)
+
+
+def parse_telemetry(
+    data: dict, previous: Optional[LocalTelemetry] = None
+) -> LocalTelemetry:
+    """Build a LocalTelemetry from a reply; bad values become None.
+
+    Missing values are taken from previous when given, so that a broadcast
+    carrying only some keys updates the last full telemetry of the device.
+    """
+    values: List[Any] = []
+    for field, (key, convert) in zip(fields(LocalTelemetry), TELEMETRY_FIELDS):
+        raw = data.get(key)
+        if raw in (None, ""):
+            values.append(None if previous is None else getattr(previous, field.name))
+            continue
+        try:
+            values.append(convert(raw))
+        except (TypeError, ValueError):
+            values.append(None)
+    return LocalTelemetry(*values)
+
+
+@dataclass(frozen=True, slots=True)
+class Parameter:
+    id: int
+    name: str
+    type: int
+    scale: int = 1
+
+    def decode(self, raw: str) -> Any:
+        if self.type == TYPE_BOOL:
+            return raw == "1"
+        value = int(raw)
+        return value / self.scale if self.scale != 1 else value
+
+    def encode(self, value: Any) -> List:
+        if self.type == TYPE_BOOL:
+            raw = "1" if value else "0"
+        else:
+            raw = str(int(round(value * self.scale)))
+        return [self.id, self.type, raw]
+
+
+PARAMETERS: Tuple[Parameter, ...] = (
+    Parameter(2, "mode", TYPE_UINT8),
+    Parameter(3, "control_type", TYPE_UINT8),
+    Parameter(4, "manual_air_temperature", TYPE_INT8),
+    Parameter(5, "manual_temperature", TYPE_INT8),
+    Parameter(6, "away_air_temperature", TYPE_INT8),
+    Parameter(7, "away_temperature", TYPE_INT8),
+    Parameter(17, "power", TYPE_UINT16),
+    Parameter(18, "sensor_type", TYPE_UINT8),
+    Parameter(19, "hysteresis", TYPE_UINT8, scale=10),
+    Parameter(20, "air_correction", TYPE_INT8, scale=10),
+    Parameter(21, "floor_correction", TYPE_INT8, scale=10),
+    Parameter(23, "brightness", TYPE_UINT8),
+    Parameter(26, "upper_limit", TYPE_INT8),
+    Parameter(27, "lower_limit", TYPE_INT8),
+    Parameter(109, "off_button_lock", TYPE_BOOL),
+    Parameter(124, "children_lock", TYPE_BOOL),
+    Parameter(125, "power_off", TYPE_BOOL),
+)
+PARAMETERS_BY_ID: Dict[int, Parameter] = {p.id: p for p in PARAMETERS}
+PARAMETERS_BY_NAME: Dict[str, Parameter] = {p.name: p for p in PARAMETERS}
+
+# Parameters that follow the thermostat's own state rather than its settings;
+# they are read with the telemetry instead of being cached.
+VOLATILE_PARAMETERS = frozenset({"manual_temperature", "power_off"})
+
+
+def parse_parameters(data: dict) -> Dict[str, Any]:
+    """Decode the "par" array of a cmd:1 reply, skipping unknown ids."""
+    result: Dict[str, Any] = {}
+    for item in data.get("par") or ():
+        try:
+            number, _type, raw = item
+            parameter = PARAMETERS_BY_ID.get(int(number))
+            if parameter is not None:
+                result[parameter.name] = parameter.decode(raw)
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def encode_parameters(values: Iterable[Tuple[str, Any]]) -> List[List]:
+    """Build a "par" array; raises KeyError for unknown parameter names."""
+    return [
+        PARAMETERS_BY_NAME[name].encode(value)
+        for name, value in values
+        if value is not None
+    ]
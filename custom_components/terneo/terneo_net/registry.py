@@ -0,0 +1,81 @@
+from typing import Dict, Generic, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeviceRegistry(Generic[T]):
+    """Devices keyed by serial number, with secondary cloud id and IP indexes.
+
+    Devices only need a ``serial_number`` attribute; ``id`` and ``ip`` are
+    indexed when present. The indexes are kept in sync on every change, so
+    re-adding a device whose IP moved drops the stale IP entry.
+    """
+
+    def __init__(self, devices: Iterable[T] = ()):
+        self._by_serial: Dict[str, T] = {}
+        self._by_id: Dict[int, T] = {}
+        self._by_ip: Dict[str, T] = {}
+        # Keys the device was indexed under, so they can be dropped even if
+        # the device object was mutated in place afterwards.
+        self._keys: Dict[str, tuple] = {}
+        self.replace(devices)
+
+    def __len__(self) -> int:
+        return len(self._by_serial)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(list(self._by_serial.values()))
+
+    def __contains__(self, serial_number: object) -> bool:
+        return serial_number in self._by_serial
+
+    def get(self, serial_number: str) -> Optional[T]:
+        return self._by_serial.get(serial_number)
+
+    def get_by_id(self, device_id: int) -> Optional[T]:
+        return self._by_id.get(device_id)
+
+    def get_by_ip(self, ip: str) -> Optional[T]:
+        return self._by_ip.get(ip)
+
+    def add(self, device: T) -> bool:
+        """Add or replace a device. Returns False if nothing changed."""
+        serial_number = device.serial_number
+        keys = (getattr(device, "id", None), getattr(device, "ip", None))
+        if self._by_serial.get(serial_number) is device and (
+            self._keys.get(serial_number) == keys
+        ):
+            return False
+
+        self.remove(serial_number)
+        self._by_serial[serial_number] = device
+        self._keys[serial_number] = keys
+        device_id, ip = keys
+        if device_id is not None:
+            self._by_id[device_id] = device
+        if ip:
+            self._by_ip[ip] = device
+        return True
+
+    def remove(self, serial_number: str) -> Optional[T]:
+        device = self._by_serial.pop(serial_number, None)
+        if device is None:
+            return None
+        device_id, ip = self._keys.pop(serial_number)
+        if device_id is not None and self._by_id.get(device_id) is device:
+            del self._by_id[device_id]
+        if ip and self._by_ip.get(ip) is device:
+            del self._by_ip[ip]
+        return device
+
+    def replace(self, devices: Iterable[T]) -> None:
+        """Replace the whole registry content."""
+        self.clear()
+        for device in devices:
+            self.add(device)
+
+    def clear(self) -> None:
+        self._by_serial.clear()
+        self._by_id.clear()
+        self._by_ip.clear()
+        self._keys.clear()
@@ -0,0 +1,105 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+BACKOFF_BASE = 1.0
+MAX_BACKOFF = 60.0
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter, or the server's Retry-After."""
+    if retry_after is not None:
+        return min(max(retry_after, 0.0), MAX_BACKOFF)
+    return random.uniform(0, min(BACKOFF_BASE * 2**attempt, MAX_BACKOFF))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Take one token, waiting for it if needed. Returns the time waited."""
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited = delay
+                self._refill()
+            self._tokens -= 1
+        return waited
+
+
+class CircuitBreaker:
+    """Stop calling a failing backend and probe it with one request at a time.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    allow() returns False. Once `reset_timeout` seconds passed a single probe
+    is let through; its success closes the circuit, its failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        elif now - self._probe_started < self.reset_timeout:
+            # A probe is already in flight.
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
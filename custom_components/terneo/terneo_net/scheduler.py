@@ -0,0 +1,121 @@
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .models import TerneoTelemetry
+
+MIN_INTERVAL = 15.0
+BASE_INTERVAL = 60.0
+STABLE_INTERVAL = 300.0
+OFF_INTERVAL = 900.0
+BACKOFF_FACTOR = 1.5
+JITTER = 0.1
+
+
+class _DeviceSchedule:
+    __slots__ = ("interval", "next_poll", "telemetry")
+
+    def __init__(self, interval: float, next_poll: float):
+        self.interval = interval
+        self.next_poll = next_poll
+        self.telemetry: Optional[TerneoTelemetry] = None
+
+
+class PollScheduler:
+    """Per-device poll intervals adapted to recent activity.
+
+    A device is polled every MIN_INTERVAL seconds right after a command or a
+    change of its heating, power or setpoint state. While nothing changes the
+    interval grows by BACKOFF_FACTOR up to STABLE_INTERVAL, or OFF_INTERVAL
+    for devices that are switched off. Every interval is randomized by
+    +/- JITTER so devices and accounts drift apart instead of polling in sync.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = MIN_INTERVAL,
+        base_interval: float = BASE_INTERVAL,
+        stable_interval: float = STABLE_INTERVAL,
+        off_interval: float = OFF_INTERVAL,
+        jitter: float = JITTER,
+    ):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.stable_interval = stable_interval
+        self.off_interval = off_interval
+        self.jitter = jitter
+        self._devices: Dict[str, _DeviceSchedule] = {}
+
+    def _schedule(self, serial_number: str, now: float) -> _DeviceSchedule:
+        schedule = self._devices.get(serial_number)
+        if schedule is None:
+            # New devices are polled right away.
+            schedule = self._devices[serial_number] = _DeviceSchedule(
+                self.base_interval, now
+            )
+        return schedule
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def due(
+        self,
+        serial_numbers: Iterable[str],
+        now: Optional[float] = None,
+        window: float = 0.0,
+    ) -> List[str]:
+        """Return the devices due now or within the next window seconds."""
+        now = time.monotonic() if now is None else now
+        deadline = now + window
+        return [
+            sn
+            for sn in serial_numbers
+            if self._schedule(sn, now).next_poll <= deadline
+        ]
+
+    def next_poll(self) -> Optional[float]:
+        """Monotonic time of the earliest scheduled poll."""
+        if not self._devices:
+            return None
+        return min(s.next_poll for s in self._devices.values())
+
+    def record(
+        self,
+        serial_number: str,
+        telemetry: Optional[TerneoTelemetry],
+        now: Optional[float] = None,
+    ) -> None:
+        """Reschedule a device after it was polled."""
+        now = time.monotonic() if now is None else now
+        schedule = self._schedule(serial_number, now)
+        if telemetry is None:
+            # Failed poll: retry within BASE_INTERVAL at the latest.
+            interval = min(schedule.interval, self.base_interval)
+        else:
+            previous = schedule.telemetry
+            schedule.telemetry = telemetry
+            if previous is None:
+                interval = self.base_interval
+            elif (
+                previous.heating,
+                previous.power_off,
+                previous.target_temperature,
+            ) != (telemetry.heating, telemetry.power_off, telemetry.target_temperature):
+                interval = self.min_interval
+            else:
+                limit = (
+                    self.off_interval if telemetry.power_off else self.stable_interval
+                )
+                interval = min(schedule.interval * BACKOFF_FACTOR, limit)
+            schedule.interval = interval
+        schedule.next_poll = now + self._jittered(interval)
+
+    def boost(self, serial_number: str, now: Optional[float] = None) -> None:
+        """Poll a device soon, e.g. after a command was sent to it."""
+        now = time.monotonic() if now is None else now
+        schedule = self._schedule(serial_number, now)
+        schedule.interval = self.min_interval
+        schedule.next_poll = min(schedule.next_poll, now + self.min_interval)
+
+    def remove(self, serial_number: str) -> None:
+        self._devices.pop(serial_number, None)
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CloudSession:
+    """Access token of one cloud account with single-flight re-authentication.
+
+    Every token change bumps ``generation``. A request remembers the
+    generation it was sent with; when it fails with 401 it asks for a refresh
+    of that generation, and only the first such caller actually logs in while
+    the others wait for it and reuse the new token.
+    """
+
+    def __init__(
+        self,
+        login: Callable[[], Awaitable[Optional[str]]],
+        token: Optional[str] = None,
+    ):
+        self._login = login
+        self._lock = asyncio.Lock()
+        self.token = token
+        self.generation = 0
+        self.on_token_changed: List[Callable[[Optional[str]], None]] = []
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        if not self.token:
+            return {}
+        return {"Authorization": f"Token {self.token}"}
+
+    async def ensure_token(self) -> bool:
+        """Log in only if there is no token yet."""
+        if self.token:
+            return True
+        return await self.refresh(self.generation)
+
+    async def refresh(self, failed_generation: int) -> bool:
+        """Re-authenticate unless another caller already replaced the token."""
+        async with self._lock:
+            if failed_generation != self.generation:
+                return self.token is not None
+
+            _LOGGER.debug("Logging in to Terneo cloud")
+            token = await self._login()
+            self.token = token
+            self.generation += 1
+            for callback in self.on_token_changed:
+                callback(token)
+            return token is not None
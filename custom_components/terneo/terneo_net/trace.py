@@ -0,0 +1,225 @@
+import asyncio
+import bisect
+import gzip
+import json
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+TRACE_VERSION = 1
+MAX_TRACE_EVENTS = 500_000
+REDACTED = "**REDACTED**"
+REDACT_KEYS = frozenset({"email", "password", "access_token", "token"})
+
+
+def redact(value):
+    """Copy of a JSON value with credentials and tokens replaced."""
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if k in REDACT_KEYS else redact(v) for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+def _decode_body(content: bytes):
+    if not content:
+        return None
+    try:
+        return redact(json.loads(content))
+    except (UnicodeDecodeError, ValueError):
+        return content.decode("utf-8", "replace")
+
+
+def request_kind(method: str, url: str, body) -> str:
+    """Key matching replayed requests to recorded ones.
+
+    LAN requests all go to api.cgi, so the command or "par" is part of it.
+    """
+    if isinstance(body, dict):
+        if "cmd" in body:
+            return f"{method} {url} cmd:{body['cmd']}"
+        if "par" in body:
+            return f"{method} {url} par"
+    return f"{method} {url}"
+
+
+class TraceRecorder:
+    """Collect HTTP exchanges and UDP packets of the services in memory.
+
+    Services call record_http/record_datagram when their `recorder` is set;
+    save() writes the trace as (gzipped) JSON lines. Credentials and tokens
+    are redacted, headers are not kept except Retry-After.
+    """
+
+    def __init__(self, max_events: int = MAX_TRACE_EVENTS):
+        self.max_events = max_events
+        self.started = time.time()
+        self._start = time.monotonic()
+        self.events: List[dict] = []
+        self.dropped = 0
+
+    def _add(self, event: dict) -> None:
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        self.events.append(event)
+
+    def record_http(
+        self,
+        source: str,
+        outcome: Union[httpx.Response, httpx.HTTPError],
+        started: float,
+    ) -> None:
+        """Record a response or the transport error a request ended with."""
+        now = time.monotonic()
+        try:
+            request = outcome.request
+        except RuntimeError:
+            return
+        event = {
+            "t": round(started - self._start, 4),
+            "k": "http",
+            "src": source,
+            "m": request.method,
+            "u": str(request.url),
+            "q": _decode_body(request.content),
+            "d": round(now - started, 4),
+        }
+        if isinstance(outcome, httpx.Response):
+            event["s"] = outcome.status_code
+            event["r"] = _decode_body(outcome.content)
+            retry_after = outcome.headers.get("Retry-After")
+            if retry_after:
+                event["h"] = {"Retry-After": retry_after}
+        else:
+            event["s"] = type(outcome).__name__
+        self._add(event)
+
+    def record_datagram(self, payload: bytes, addr: Tuple[str, int]) -> None:
+        self._add(
+            {
+                "t": round(time.monotonic() - self._start, 4),
+                "k": "udp",
+                "a": addr[0],
+                "p": _decode_body(payload),
+            }
+        )
+
+    def save(self, path: str) -> None:
+        """Write the trace; blocking, run it in an executor from Home Assistant."""
+        opener = gzip.open if str(path).endswith(".gz") else open
+        header = {
+            "version": TRACE_VERSION,
+            "started": self.started,
+            "events": len(self.events),
+            "dropped": self.dropped,
+        }
+        with opener(path, "wt", encoding="utf-8") as file:
+            file.write(json.dumps(header, separators=(",", ":")) + "\n")
+            for event in self.events:
+                file.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+def load_trace(path: str) -> Tuple[dict, List[dict]]:
+    """Read a trace written by TraceRecorder.save; returns header and events."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        if header.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {header.get('version')}")
+        return header, [json.loads(line) for line in file if line.strip()]
+
+
+class TraceReplay:
+    """Serve a recorded trace back to the real services.
+
+    Use `transport` as the httpx transport of the services' client. Each
+    request gets the response recorded for the same kind of request closest
+    before the current replay time, after the recorded latency; recorded
+    transport errors are raised again. Time runs `speed` times faster than
+    during the recording. play_datagrams() feeds the recorded UDP packets.
+    """
+
+    def __init__(self, events: List[dict], speed: float = 1.0):
+        self.speed = speed
+        self.duration = max((e["t"] for e in events), default=0.0)
+        self._http: Dict[str, Tuple[List[float], List[dict]]] = {}
+        self.datagrams = [e for e in events if e["k"] == "udp"]
+        for event in events:
+            if event["k"] != "http":
+                continue
+            times, recorded = self._http.setdefault(
+                request_kind(event["m"], event["u"], event["q"]), ([], [])
+            )
+            times.append(event["t"])
+            recorded.append(event)
+        self.recorded = Counter(
+            {kind: len(times) for kind, (times, _) in self._http.items()}
+        )
+        self.requests: Counter = Counter()
+        self.unmatched: Counter = Counter()
+        self._started: Optional[float] = None
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 1.0) -> "TraceReplay":
+        return cls(load_trace(path)[1], speed)
+
+    def start(self) -> None:
+        self._started = asyncio.get_running_loop().time()
+
+    @property
+    def now(self) -> float:
+        """Replay time in seconds of the recording."""
+        if self._started is None:
+            return 0.0
+        return (asyncio.get_running_loop().time() - self._started) * self.speed
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        kind = request_kind(
+            request.method, str(request.url), _decode_body(request.content)
+        )
+        self.requests[kind] += 1
+        entry = self._http.get(kind)
+        if entry is None:
+            self.unmatched[kind] += 1
+            return httpx.Response(404)
+        times, recorded = entry
+        index = max(bisect.bisect_right(times, self.now) - 1, 0)
+        event = recorded[index]
+        await asyncio.sleep(event["d"] / self.speed)
+
+        status = event["s"]
+        if isinstance(status, str):
+            error = getattr(httpx, status, None)
+            if not (isinstance(error, type) and issubclass(error, httpx.HTTPError)):
+                error = httpx.TransportError
+            raise error(f"Replayed {status}", request=request)
+        body = event.get("r")
+        if isinstance(body, (dict, list)):
+            return httpx.Response(status, json=body, headers=event.get("h"))
+        return httpx.Response(status, text=body or "", headers=event.get("h"))
+
+    async def play_datagrams(
+        self, handler: Callable[[bytes, Tuple[str, int]], None]
+    ) -> int:
+        """Hand the recorded UDP packets to handler at their replay time."""
+        loop = asyncio.get_running_loop()
+        if self._started is None:
+            self.start()
+        for event in self.datagrams:
+            delay = self._started + event["t"] / self.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            payload = event["p"]
+            if not isinstance(payload, str):
+                payload = json.dumps(payload)
+            handler(payload.encode(), (event["a"], 0))
+        return len(self.datagrams)
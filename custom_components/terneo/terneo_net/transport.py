@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .cache import TelemetryCache
+from .cloud import CloudService
+from .exceptions import TerneoConnectionError
+from .local import LocalService
+from .models import TerneoTelemetry
+
+PATH_LOCAL = "local"
+PATH_CLOUD = "cloud"
+
+STATS_WINDOW = 20
+MAX_CONSECUTIVE_FAILURES = 3
+LOCAL_RETRY_INTERVAL = 60.0
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PathStats:
+    """Rolling latency and error rate of one transport path for one device."""
+
+    __slots__ = ("_latencies", "_errors", "consecutive_failures", "suspended_until")
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self._latencies: deque = deque(maxlen=window)
+        self._errors: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.suspended_until = 0.0
+
+    def record(self, latency: float, ok: bool) -> None:
+        self._latencies.append(latency)
+        self._errors.append(not ok)
+        if ok:
+            self.consecutive_failures = 0
+            self.suspended_until = 0.0
+        else:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                self.suspended_until = time.monotonic() + LOCAL_RETRY_INTERVAL
+
+    @property
+    def latency(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        return sum(self._latencies) / len(self._latencies)
+
+    @property
+    def error_rate(self) -> float:
+        if not self._errors:
+            return 0.0
+        return sum(self._errors) / len(self._errors)
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.suspended_until
+
+    def as_dict(self) -> dict:
+        return {
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "samples": len(self._latencies),
+            "available": self.available,
+        }
+
+
+class TransportRouter:
+    """Route device reads and writes to the LAN API with a cloud fallback.
+
+    A device is served locally once discovery has seen it and while its local
+    path keeps answering; after MAX_CONSECUTIVE_FAILURES errors it is moved to
+    the cloud for LOCAL_RETRY_INTERVAL seconds before local is tried again.
+
+    Reads go through a TelemetryCache: fresh entries cost no request, older
+    ones are served while a background refresh runs, and the last known good
+    telemetry stands in for devices that fail to answer.
+    """
+
+    def __init__(
+        self,
+        cloud: CloudService,
+        local: Optional[LocalService] = None,
+        cache: Optional[TelemetryCache] = None,
+    ):
+        self.cloud = cloud
+        self.local = local
+        self.cache = cache or TelemetryCache()
+        self._stats: Dict[Tuple[str, str], PathStats] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Called with the outcome of each background refresh, None on failure.
+        self.on_refresh: List[Callable[[str, Optional[TerneoTelemetry]], None]] = []
+
+    def stats(self, serial_number: str, path: str) -> PathStats:
+        key = (serial_number, path)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = PathStats()
+        return stats
+
+    def all_stats(self) -> Dict[str, Dict[str, dict]]:
+        result: Dict[str, Dict[str, dict]] = {}
+        for (serial_number, path), stats in self._stats.items():
+            result.setdefault(serial_number, {})[path] = stats.as_dict()
+        return result
+
+    def preferred_path(self, serial_number: str) -> str:
+        if (
+            self.local is not None
+            and self.local.get_device(serial_number) is not None
+            and self.stats(serial_number, PATH_LOCAL).available
+        ):
+            return PATH_LOCAL
+        return PATH_CLOUD
+
+    async def _call(
+        self, serial_number: str, path: str, call: Callable[[], Awaitable[T]]
+    ) -> Optional[T]:
+        start = time.monotonic()
+        try:
+            result = await call()
+        except Exception as ex:  # noqa: BLE001
+            _LOGGER.debug("%s request for %s failed: %s", path, serial_number, ex)
+            result = None
+        self.stats(serial_number, path).record(time.monotonic() - start, bool(result))
+        return result
+
+    async def get_telemetry_batch(
+        self, serial_numbers: Iterable[str]
+    ) -> Dict[str, TerneoTelemetry]:
+        """Fetch telemetry for many devices.
+
+        Fresh cache entries are served from memory. Older ones are served
+        too, while a single background refresh runs for them and reports to
+        the on_refresh callbacks. Devices without cached telemetry are
+        fetched right away, like those changed by a write: broadcasts are
+        served from memory, local devices are polled concurrently and the rest
+        is fetched in one cloud batch. Devices that fail keep their last known
+        good telemetry while it is not older than the cache allows.
+        """
+        result: Dict[str, TerneoTelemetry] = {}
+        pending = []
+        outdated = []
+        for serial_number in serial_numbers:
+            cached = self.cache.get(serial_number)
+            if cached is None or self.cache.is_expired(serial_number):
+                pending.append(serial_number)
+                continue
+            result[serial_number] = cached
+            if not self.cache.is_fresh(serial_number) and not self.is_refreshing(
+                serial_number
+            ):
+                outdated.append(serial_number)
+        if outdated:
+            task = asyncio.ensure_future(self._refresh(outdated))
+            for serial_number in outdated:
+                self._refreshing[serial_number] = task
+        fetched = await self._fetch_and_cache(pending)
+        for serial_number in pending:
+            telemetry = fetched.get(serial_number) or self.cache.get(serial_number)
+            if telemetry is not None:
+                result[serial_number] = telemetry
+        return result
+
+    def is_refreshing(self, serial_number: str) -> bool:
+        """Return True while a background refresh of the device runs."""
+        return serial_number in self._refreshing
+
+    async def _refresh(self, serial_numbers: List[str]) -> None:
+        try:
+            fetched = await self._fetch_and_cache(serial_numbers)
+        except Exception:  # noqa: BLE001
+            _LOGGER.exception("Error refreshing telemetry")
+            fetched = {}
+        finally:
+            for serial_number in serial_numbers:
+                self._refreshing.pop(serial_number, None)
+        for serial_number in serial_numbers:
+            for callback in self.on_refresh:
+                try:
+                    callback(serial_number, fetched.get(serial_number))
+                except Exception:  # noqa: BLE001
+                    _LOGGER.exception("Error in telemetry refresh callback")
+
+    async def _fetch_and_cache(
+        self, serial_numbers: List[str]
+    ) -> Dict[str, TerneoTelemetry]:
+        """Fetch and cache telemetry; devices that fail are marked stale."""
+        if not serial_numbers:
+            return {}
+        fetched = await self._fetch_telemetry_batch(serial_numbers)
+        for serial_number in serial_numbers:
+            telemetry = fetched.get(serial_number)
+            if telemetry is None:
+                self.cache.mark_stale(serial_number)
+            else:
+                self.cache.put(serial_number, telemetry)
+        return fetched
+
+    async def _fetch_telemetry_batch(
+        self, serial_numbers: Iterable[str]
+    ) -> Dict[str, TerneoTelemetry]:
+        serial_numbers = list(serial_numbers)
+        local_serials = [
+            sn for sn in serial_numbers if self.preferred_path(sn) == PATH_LOCAL
+        ]
+        result: Dict[str, TerneoTelemetry] = {}
+
+        # Devices that broadcast their state recently need no request at all.
+        for serial_number in local_serials:
+            telemetry = self.local.get_cached_telemetry(serial_number)
+            if telemetry:
+                result[serial_number] = telemetry
+        local_serials = [sn for sn in local_serials if sn not in result]
+
+        async def fetch_local(serial_number: str) -> None:
+            telemetry = await self._call(
+                serial_number,
+                PATH_LOCAL,
+                lambda: self.local.get_telemetry(serial_number),
+            )
+            if telemetry:
+                result[serial_number] = telemetry
+
+        await asyncio.gather(*(fetch_local(sn) for sn in local_serials))
+
+        missing = [sn for sn in serial_numbers if sn not in result]
+        if missing:
+            start = time.monotonic()
+            try:
+                cloud_result = await self.cloud.get_telemetry_batch(missing)
+            except TerneoConnectionError as err:
+                # Keep what the LAN returned; the cache covers the rest.
+                _LOGGER.debug("Cloud telemetry batch failed: %s", err)
+                cloud_result = {}
+            latency = time.monotonic() - start
+            for serial_number in missing:
+                self.stats(serial_number, PATH_CLOUD).record(
+                    latency, serial_number in cloud_result
+                )
+            result.update(cloud_result)
+        return result
+
+    async def get_parameters(self, serial_number: str) -> Optional[Dict[str, Any]]:
+        """Return the device settings; only the LAN API exposes them.
+
+        Settings are read rarely and a device may answer cmd:4 but not cmd:1,
+        so these reads don't count towards the LAN path statistics.
+        """
+        if self.local is None or self.local.get_device(serial_number) is None:
+            return None
+        try:
+            return await self.local.get_parameters(serial_number)
+        except Exception as ex:  # noqa: BLE001
+            _LOGGER.debug("Reading settings of %s failed: %s", serial_number, ex)
+            return None
+
+    async def apply(
+        self,
+        serial_number: str,
+        temperature: Optional[int] = None,
+        power_off: Optional[bool] = None,
+    ) -> bool:
+        return await self._write(
+            serial_number,
+            lambda: self.local.apply(serial_number, temperature, power_off),
+            lambda: self.cloud.apply(serial_number, temperature, power_off),
+        )
+
+    async def close(self) -> None:
+        """Cancel background refreshes and close both services."""
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        if self.local is not None:
+            await self.local.close()
+        await self.cloud.close()
+
+    async def _write(
+        self,
+        serial_number: str,
+        local_call: Callable[[], Awaitable[bool]],
+        cloud_call: Callable[[], Awaitable[bool]],
+    ) -> bool:
+        if self.preferred_path(serial_number) == PATH_LOCAL and await self._call(
+            serial_number, PATH_LOCAL, local_call
+        ):
+            success = True
+        else:
+            success = bool(await self._call(serial_number, PATH_CLOUD, cloud_call))
+        if success:
+            # Cached telemetry predates the write: poll the device again.
+            self.cache.expire(serial_number)
+            if self.local is not None:
+                self.local.invalidate_telemetry(serial_number)
+        return success